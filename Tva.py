@@ -1,545 +1,2194 @@
+import argparse
+import atexit
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import requests
-from bs4 import BeautifulSoup
+import os
+import sys
+import subprocess
 import time
+import json
+import shutil
+import sqlite3
+import functools
+import hashlib
+import itertools
+import heapq
+import threading
+import contextlib
+import io
+import tracemalloc
+import tempfile
+import platform
+import re
+import unicodedata
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from urllib.parse import urlparse
+try:
+    import resource
+except ImportError:  # indisponible sous Windows
+    resource = None
 import warnings
 warnings.filterwarnings('ignore')
 
+# Répertoire des fichiers de données de référence versionnés
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+class ReferenceStore:
+    """
+    Séries historiques de référence, indexées en tableaux numpy (entreprise × année)
+    
+    Chargées une seule fois par processus depuis un fichier JSON versionné :
+    ajouter des données pour une entreprise ne demande aucune modification du code.
+    """
+    
+    METRICS = ['vat', 'revenue', 'profit', 'tax_rate']
+    
+    def __init__(self, version, start_year, series):
+        self.version = version
+        self.start_year = start_year
+        self.companies = sorted({company for metric in series.values() for company in metric})
+        self.index = {company: i for i, company in enumerate(self.companies)}
+        
+        n_years = max((len(values) for metric in series.values() for values in metric.values()), default=0)
+        self.years = np.arange(start_year, start_year + n_years)
+        self.values = {}
+        for metric in self.METRICS:
+            values = np.full((len(self.companies), n_years), np.nan)
+            for company, history in series.get(metric, {}).items():
+                values[self.index[company], :len(history)] = history
+            self.values[metric] = values
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'reference_series.json')):
+        """Charge (une fois par processus et par fichier) le magasin de référence"""
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return cls(data['version'], data['start_year'], data['series'])
+    
+    def row(self, metric, company, years=None):
+        """
+        Série d'une entreprise sur les années demandées (tableau numpy), NaN pour les années
+        que la référence ne couvre pas ; None si l'entreprise n'y figure pas
+        """
+        i = self.index.get(company)
+        if i is None:
+            return None
+        offsets = np.arange(len(self.years)) if years is None else np.asarray(years) - self.start_year
+        covered = (offsets >= 0) & (offsets < len(self.years))
+        values = np.full(len(offsets), np.nan)
+        values[covered] = self.values[metric][i, offsets[covered]]
+        return values
+    
+    def series(self, metric, company, years=None):
+        """Années couvertes de la série d'une entreprise {année: valeur} ; {} si aucune"""
+        values = self.row(metric, company, years)
+        if values is None:
+            return {}
+        years = self.years if years is None else years
+        return {str(year): float(value) for year, value in zip(years, values) if not np.isnan(value)}
+
+
+class CompanyRegistry(Mapping):
+    """
+    Registre des entreprises suivies (nom, ISIN, secteur, pays, capitalisation, devise)
+    
+    Stocké en colonnes compactes (tableaux numpy, catégoriels pour les modalités répétées)
+    avec un index de hachage nom → position ; se comporte comme un dictionnaire
+    {nom: {'isin', 'sector', 'country', 'market_cap', 'currency'}} pour le code existant.
+    Chargé depuis un fichier CSV ou Parquet : la cote complète (~1 800 émetteurs) ou un extrait.
+    """
+    
+    COLUMNS = ('name', 'isin', 'sector', 'country', 'market_cap', 'currency')
+    FIELDS = COLUMNS[1:]
+    
+    def __init__(self, names, isin, sector, country, market_cap, currency):
+        self.names = np.asarray(names, dtype=object)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if len(self.index) != len(self.names):
+            raise ValueError("Noms d'entreprises en double dans le registre")
+        self.isin = np.asarray(isin, dtype='U12')
+        self.sector = pd.Categorical(sector)
+        self.country = pd.Categorical(country)
+        self.market_cap = np.asarray(market_cap, dtype=float)
+        self.currency = pd.Categorical(currency)
+        self._row_keys = {}
+    
+    @classmethod
+    def from_frame(cls, frame):
+        """Registre construit à partir d'un DataFrame aux colonnes COLUMNS (ISIN et devise facultatifs)"""
+        return cls(frame['name'].astype(str).to_numpy(),
+                   frame['isin'].fillna('').astype(str).to_numpy() if 'isin' in frame else [''] * len(frame),
+                   frame['sector'], frame['country'], frame['market_cap'],
+                   frame['currency'] if 'currency' in frame else ['EUR'] * len(frame))
+    
+    @classmethod
+    def from_mapping(cls, companies):
+        """Registre construit à partir d'un dictionnaire {nom: {'sector', 'country', 'market_cap', ...}}"""
+        info = list(companies.values())
+        return cls(list(companies),
+                   [entry.get('isin', '') for entry in info],
+                   [entry['sector'] for entry in info],
+                   [entry['country'] for entry in info],
+                   [entry['market_cap'] for entry in info],
+                   [entry.get('currency', 'EUR') for entry in info])
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'companies.csv')):
+        """Charge (une fois par processus et par fichier) le registre depuis un fichier CSV ou Parquet"""
+        if path.endswith('.parquet'):
+            frame = pd.read_parquet(path, engine='pyarrow')
+        else:
+            frame = pd.read_csv(path, dtype={'name': str, 'isin': str, 'sector': 'category',
+                                             'country': 'category', 'currency': 'category'})
+        return cls.from_frame(frame)
+    
+    def to_frame(self):
+        """Registre sous forme de DataFrame (colonnes COLUMNS)"""
+        return pd.DataFrame({'name': self.names, 'isin': self.isin, 'sector': self.sector,
+                             'country': self.country, 'market_cap': self.market_cap, 'currency': self.currency})
+    
+    def __getitem__(self, name):
+        i = self.index[name]
+        return {'isin': str(self.isin[i]), 'sector': self.sector[i], 'country': self.country[i],
+                'market_cap': float(self.market_cap[i]), 'currency': self.currency[i]}
+    
+    def __iter__(self):
+        return iter(self.names.tolist())
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __contains__(self, name):
+        return name in self.index
+    
+    def row_key(self, name):
+        """
+        Empreinte courte de la ligne d'une entreprise (ISIN, secteur, pays, capitalisation, devise),
+        calculée une seule fois par entreprise (le registre n'est pas modifié en place)
+        """
+        key = self._row_keys.get(name)
+        if key is None:
+            i = self.index.get(name)
+            if i is None:
+                return '-'
+            row = (str(self.isin[i]), self.sector[i], self.country[i], float(self.market_cap[i]), self.currency[i])
+            key = self._row_keys[name] = hashlib.sha256(repr(row).encode('utf-8')).hexdigest()[:12]
+        return key
+    
+    def positions(self, names=None):
+        """Positions des entreprises dans le registre (KeyError pour un nom inconnu)"""
+        if names is None:
+            return np.arange(len(self.names))
+        return np.fromiter((self.index[name] for name in names), dtype=np.int64, count=len(names))
+    
+    def column(self, field, names=None):
+        """Valeurs d'un champ pour les entreprises demandées (toutes par défaut), en tableau numpy"""
+        return np.asarray(getattr(self, field))[self.positions(names)]
+    
+    def take(self, positions, names=None):
+        """Registre des lignes aux positions données, éventuellement renommées"""
+        return CompanyRegistry(self.names[positions] if names is None else names, self.isin[positions],
+                               self.sector[positions], self.country[positions], self.market_cap[positions],
+                               self.currency[positions])
+    
+    def subset(self, names):
+        """Registre restreint aux entreprises nommées, dans l'ordre demandé"""
+        return self.take(self.positions(list(names)))
+    
+    def filter(self, sectors=None, countries=None):
+        """Registre restreint aux secteurs et/ou pays donnés, dans l'ordre du registre"""
+        mask = np.ones(len(self.names), dtype=bool)
+        if sectors:
+            mask &= np.asarray(self.sector.isin(sectors))
+        if countries:
+            mask &= np.asarray(self.country.isin(countries))
+        return self.take(np.flatnonzero(mask))
+    
+    def memory_usage(self):
+        """Empreinte mémoire approximative du registre, en octets (index de hachage compris)"""
+        size = self.names.nbytes + sum(sys.getsizeof(name) for name in self.names) + sys.getsizeof(self.index)
+        size += self.isin.nbytes + self.market_cap.nbytes
+        return size + sum(column.memory_usage(deep=True) for column in (self.sector, self.country, self.currency))
+
+
+class ModelParameters:
+    """
+    Paramètres du modèle de simulation, chargés une seule fois depuis un fichier JSON versionné :
+    par secteur, bases de TVA et de chiffre d'affaires (parts de la capitalisation), marge nette
+    et ajustement du taux d'imposition ; par pays, taux d'imposition de base
+    
+    Les secteurs et pays absents du fichier reçoivent les valeurs « default » : en ajouter ne
+    demande aucune modification du code. Les recherches portent sur des tableaux entiers.
+    """
+    
+    SECTOR_FIELDS = ('vat_base', 'revenue_ratio', 'margin', 'tax_adjustment')
+    COUNTRY_FIELDS = ('base_tax_rate',)
+    
+    def __init__(self, version, sectors, countries):
+        self.version = version
+        self.sectors, self.sector_values = self._table(sectors, self.SECTOR_FIELDS)
+        self.countries, self.country_values = self._table(countries, self.COUNTRY_FIELDS)
+        # Empreinte du contenu de la table (clé du cache disque : un fichier modifié sans changer
+        # de version invalide quand même les séries simulées)
+        self.digest = hashlib.sha256(json.dumps(
+            [list(self.sectors), {field: values.tolist() for field, values in self.sector_values.items()},
+             list(self.countries), {field: values.tolist() for field, values in self.country_values.items()}]
+        ).encode('utf-8')).hexdigest()[:12]
+    
+    @staticmethod
+    def _table(entries, fields):
+        """Index des modalités et une colonne numpy par champ (valeurs par défaut en dernière position)"""
+        default = entries['default']
+        names = pd.Index([name for name in entries if name != 'default'])
+        values = {field: np.array([entries[name].get(field, default[field]) for name in names] + [default[field]],
+                                  dtype=float)
+                  for field in fields}
+        return names, values
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'parameters.json')):
+        """Charge (une fois par processus et par fichier) les paramètres du modèle"""
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return cls(data['version'], data['sectors'], data['countries'])
+    
+    @staticmethod
+    def _codes(names, values):
+        """Positions des modalités dans la table ; les inconnues pointent sur les valeurs par défaut"""
+        codes = names.get_indexer(values)
+        codes[codes < 0] = len(names)
+        return codes
+    
+    def simulation_bases(self, sectors, countries, market_caps):
+        """
+        Bases de simulation d'un univers d'entreprises (tableaux alignés sur les entreprises) :
+        TVA et chiffre d'affaires annuels, marge nette et taux d'imposition de base
+        """
+        sector_codes = self._codes(self.sectors, sectors)
+        country_codes = self._codes(self.countries, countries)
+        market_caps = np.asarray(market_caps, dtype=float)
+        base_vat = market_caps * self.sector_values['vat_base'][sector_codes]
+        base_revenue = market_caps * self.sector_values['revenue_ratio'][sector_codes]
+        margin = self.sector_values['margin'][sector_codes]
+        base_rate = self.country_values['base_tax_rate'][country_codes] + self.sector_values['tax_adjustment'][sector_codes]
+        return base_vat, base_revenue, margin, base_rate
+
+
+class VATSchedule:
+    """
+    Barème des taux de TVA par pays, sous forme de périodes d'application au mois près
+    (taux normal, intermédiaire et réduit), chargé une seule fois depuis un fichier JSON versionné
+    
+    Les débuts de période de tous les pays sont rangés dans un seul tableau trié de clés
+    (pays, mois) : la résolution d'une colonne entière de dates est un unique searchsorted.
+    Les pays absents du barème reçoivent le barème « default » ; ils sont signalés une fois
+    chacun et listés dans `defaulted`.
+    """
+    
+    KINDS = ('standard', 'intermediate', 'reduced')
+    
+    # Écart entre les clés de deux pays (en mois, bien au-delà de toute date utile)
+    SPAN = 12 * 10000
+    
+    def __init__(self, version, countries):
+        self.version = version
+        names = [name for name in countries if name != 'default']
+        self.countries = pd.Index(names)
+        
+        keys, values = [], {kind: [] for kind in self.KINDS}
+        for code, name in enumerate(names + ['default']):
+            for period in sorted(countries[name], key=lambda period: period['from']):
+                year, month = period['from'].split('-')
+                keys.append(code * self.SPAN + self.month(int(year), int(month)))
+                for kind in self.KINDS:
+                    rate = period.get(kind)
+                    values[kind].append(np.nan if rate is None else rate)
+        self.keys = np.array(keys, dtype=np.int64)
+        self.values = {kind: np.array(rates, dtype=float) for kind, rates in values.items()}
+        # Première période de chaque pays (appliquée aussi aux dates antérieures)
+        self.first = np.searchsorted(self.keys, np.arange(len(names) + 1) * self.SPAN)
+        # Pays inconnus du barème rencontrés jusqu'ici (barème par défaut appliqué)
+        self.defaulted = set()
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'vat_rates.json')):
+        """Charge (une fois par processus et par fichier) le barème des taux de TVA"""
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return cls(data['version'], data['countries'])
+    
+    @staticmethod
+    def month(year, month=12):
+        """Indice de mois (année × 12 + mois - 1), scalaire ou tableau"""
+        return np.asarray(year, dtype=np.int64) * 12 + (np.asarray(month, dtype=np.int64) - 1)
+    
+    def codes(self, countries):
+        """
+        Codes des pays dans le barème ; les pays inconnus reçoivent le code du barème par défaut
+        et sont signalés (une fois par pays)
+        """
+        codes = self.countries.get_indexer(countries)
+        unknown = codes < 0
+        if unknown.any():
+            new = sorted(set(map(str, pd.unique(np.asarray(countries, dtype=object)[unknown]))) - self.defaulted)
+            if new:
+                self.defaulted.update(new)
+                print(f"⚠️  Pays absents du barème de TVA, taux « default » appliqués: {', '.join(new)}")
+            codes[unknown] = len(self.countries)
+        return codes
+    
+    def rates(self, codes, months, kind='standard'):
+        """Taux en vigueur pour des tableaux alignés de codes pays et d'indices de mois"""
+        codes = np.asarray(codes, dtype=np.int64)
+        positions = np.searchsorted(self.keys, codes * self.SPAN + months, side='right') - 1
+        return self.values[kind][np.maximum(positions, self.first[codes])]
+    
+    def annual_rates(self, countries, years, kind='standard', month=12):
+        """
+        Taux de chaque pays pour chaque année (tableau pays × années aplati), pris au mois
+        indiqué : par défaut celui en vigueur en décembre
+        """
+        codes = np.repeat(self.codes(countries), len(years))
+        months = np.tile(self.month(years, month), len(countries))
+        return self.rates(codes, months, kind)
+
+
+class FXRates:
+    """
+    Cours de change moyens annuels (unités de devise pour 1 € de la devise de base), chargés une
+    seule fois par processus depuis un fichier local versionné : aucune requête réseau
+    
+    La table devise × année est un tableau numpy ; la conversion d'une colonne entière est
+    une jointure vectorisée sur (devise, année) par indexation des codes.
+    """
+    
+    def __init__(self, version, base, start_year, rates):
+        self.version = version
+        self.base = base
+        self.start_year = start_year
+        currencies = sorted(rates)
+        self.currencies = pd.Index([base] + currencies)
+        n_years = max((len(values) for values in rates.values()), default=1)
+        self.years = np.arange(start_year, start_year + n_years)
+        self.table = np.ones((len(self.currencies), n_years))
+        for i, currency in enumerate(currencies, start=1):
+            values = np.asarray(rates[currency], dtype=float)
+            # Séries incomplètes : dernier cours connu reconduit
+            self.table[i] = np.concatenate([values, np.full(n_years - len(values), values[-1])])
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'fx_rates.json')):
+        """Charge (une fois par processus et par fichier) la table des cours de change"""
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return cls(data['version'], data['base'], data['start_year'], data['rates'])
+    
+    def rates(self, currencies, years):
+        """
+        Cours de chaque ligne (tableaux alignés de devises et d'années) ; hors de la période
+        couverte, le cours de l'année la plus proche est appliqué
+        """
+        currencies = pd.Categorical(currencies)
+        codes = self.currencies.get_indexer(currencies.categories)
+        if (codes < 0).any():
+            missing = ', '.join(str(currency) for currency in currencies.categories[codes < 0])
+            raise ValueError(f"Cours de change absents pour: {missing}")
+        offsets = np.clip(np.asarray(years, dtype=np.int64) - self.start_year, 0, len(self.years) - 1)
+        return self.table[codes[currencies.codes], offsets]
+
+
+class ReportSources:
+    """
+    Sources publiées (rapports annuels, pages de chiffres clés) à ingérer, décrites dans un
+    fichier JSON versionné : pour chaque entreprise, l'URL de la page, le tableau à lire
+    (expression XPath facultative), le facteur de conversion des montants en M€ et, si la page
+    ne le déclare pas, son encodage
+    
+    Les lignes des tableaux sont reconnues par leur libellé et les colonnes par leur année.
+    """
+    
+    # Libellés reconnus (minuscules, sans accents ni mentions entre parenthèses)
+    LABELS = {
+        'vat': ('tva', 'taxe sur la valeur ajoutee', 'vat', 'value added tax', 'vat paid', 'tva payee'),
+        'revenue': ("chiffre d'affaires", 'ventes', 'produit des activites ordinaires', 'revenue', 'revenues',
+                    'net sales', 'sales'),
+        'profit': ('resultat net', 'resultat net part du groupe', 'benefice net', 'net income', 'net profit',
+                   'net income group share'),
+        'tax_rate': ("taux effectif d'imposition", "taux d'imposition effectif", 'taux effectif',
+                     'effective tax rate'),
+    }
+    YEAR = re.compile(r'\b((?:19|20)\d{2})\b')
+    NUMBER = re.compile(r'^-?\d+(?:\.\d+)?$')
+    CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+    
+    def __init__(self, version, sources):
+        self.version = version
+        self.sources = sources
+        self.labels = {label: metric for metric, labels in self.LABELS.items() for label in labels}
+    
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def load(cls, path=os.path.join(DATA_DIR, 'report_sources.json')):
+        """Charge (une fois par processus et par fichier) la description des sources"""
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return cls(data['version'], data['sources'])
+    
+    @staticmethod
+    def _normalize(label):
+        label = unicodedata.normalize('NFKD', label.replace('’', "'")).encode('ascii', 'ignore').decode()
+        label = re.sub(r'\(.*?\)|\*|\s+\d+$', ' ', label.lower())
+        return ' '.join(label.replace(':', ' ').replace(',', ' ').split())
+    
+    @staticmethod
+    def _parse_number(text, decimal=None):
+        """
+        Nombre publié (« 1 234,5 », « 1,234.5 », « 1.234.567 », « (12) », « 25,8 % »), ou None
+        
+        `decimal` (',' ou '.') fixe le séparateur décimal de la source. Sans lui, le dernier de deux
+        séparateurs différents est décimal ; un séparateur répété (« 1.234.567 ») ou unique suivi de
+        trois chiffres (« 12.345 », « 1,234 ») sépare les milliers, sauf après un zéro (« 0,125 »)
+        ou dans un pourcentage.
+        """
+        text = text.replace(' ', ' ').replace('\xa0', ' ').replace('€', '').strip()
+        percent = '%' in text
+        text = text.replace('%', '').strip()
+        negative = text.startswith('(') and text.endswith(')')
+        text = text.strip('()').replace(' ', '').replace('−', '-')
+        if decimal is None:
+            separators = [char for char in text if char in ',.']
+            if len(set(separators)) == 2:
+                decimal = text[max(text.rfind(','), text.rfind('.'))]
+            elif separators:
+                integer, _, fraction = text.rpartition(separators[0])
+                grouped = (len(separators) > 1 or
+                           (len(fraction) == 3 and not percent and integer.lstrip('-') not in ('', '0')))
+                decimal = None if grouped else separators[0]
+        # Les séparateurs de milliers délimitent des groupes de trois chiffres
+        groups = re.split(r'[,.]', text.split(decimal)[0] if decimal else text)
+        if len(groups) > 1 and not (0 < len(groups[0].lstrip('-')) <= 3
+                                    and all(len(group) == 3 for group in groups[1:])):
+            return None
+        if decimal is None:
+            text = text.replace(',', '').replace('.', '')
+        else:
+            text = text.replace('.' if decimal == ',' else ',', '').replace(decimal, '.')
+        if not ReportSources.NUMBER.match(text):
+            return None
+        value = float(text)
+        return -value if negative else value
+    
+    def parse(self, document, source):
+        """
+        Extrait les séries {indicateur: {année: valeur}} des tableaux d'une page HTML (lxml)
+        
+        Une ligne d'en-tête contenant des années fixe les colonnes ; les lignes suivantes dont le
+        libellé est reconnu fournissent les valeurs (converties en M€, sauf les taux en %).
+        """
+        from lxml import html
+        # Encodage : celui de la source, sinon celui que déclare la page, sinon UTF-8 (lxml supposerait latin-1)
+        declared = self.CHARSET.search(document[:4096])
+        encoding = source.get('encoding') or (declared.group(1).decode('ascii') if declared else 'utf-8')
+        root = html.fromstring(document, parser=html.HTMLParser(encoding=encoding))
+        scale = float(source.get('scale', 1.0))
+        decimal = source.get('decimal')
+        series = {}
+        for table in root.xpath(source.get('xpath', '//table')):
+            columns = None
+            for row in table.xpath('.//tr'):
+                cells = [cell.text_content().strip() for cell in row.xpath('./th|./td')]
+                metric = self.labels.get(self._normalize(cells[0])) if cells else None
+                if metric is None:
+                    # Ligne d'en-tête (années et aucun autre nombre) : fixe les colonnes des lignes suivantes
+                    years = {i: match.group(1) for i, match in enumerate(map(self.YEAR.search, cells)) if match and i}
+                    if years and all(i in years or self._parse_number(cell, decimal) is None
+                                     for i, cell in enumerate(cells) if i):
+                        columns = years
+                    continue
+                if columns is None or metric in series:
+                    continue
+                values = {}
+                for i, year in columns.items():
+                    value = self._parse_number(cells[i], decimal) if i < len(cells) else None
+                    if value is not None:
+                        values[year] = value if metric == 'tax_rate' else value * scale
+                if values:
+                    series[metric] = values
+        return series
+
+
+class TokenBucketRateLimiter:
+    """
+    Limiteur de débit à seau de jetons pour les requêtes sortantes
+    
+    Le seau se remplit de `rate` jetons par seconde jusqu'à `capacity` ;
+    chaque requête consomme un jeton et attend s'il n'en reste plus.
+    """
+    
+    def __init__(self, rate=10.0, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens=1.0):
+        """Consomme des jetons, en bloquant jusqu'à ce qu'ils soient disponibles"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= tokens
+            # Jetons empruntés : attendre qu'ils soient regénérés
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class NoRateLimiter:
+    """Limiteur inactif pour les traitements hors ligne (--no-throttle)"""
+    
+    def acquire(self, tokens=1.0):
+        pass
+
+
+class StageProfiler:
+    """
+    Instrumentation des étapes du pipeline : nombre d'appels, temps réel, temps CPU et pic mémoire
+    
+    Le temps CPU est celui du fil d'exécution qui traite l'étape (les travaux délégués à d'autres
+    fils ou processus n'y figurent pas). Le pic mémoire, mesuré avec tracemalloc si
+    `trace_memory` est demandé, est l'allocation maximale atteinte pendant l'étape au-delà de la
+    mémoire déjà allouée à son début (valeur globale au processus si plusieurs fils travaillent).
+    """
+    
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.trace_memory = trace_memory
+        self.started = datetime.now()
+        self.wall_start = time.perf_counter()
+        self.wall_time = None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Mesure un appel de l'étape `name` (les étapes peuvent s'imbriquer)"""
+        stack = self.local.__dict__.setdefault('stack', [])
+        frame = {'peak': 0}
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Le pic est remis à zéro pour l'étape : celui de l'étape englobante est conservé à part
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['start'] = current
+        stack.append(frame)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            stack.pop()
+            memory = 0.0
+            if self.trace_memory:
+                peak = max(tracemalloc.get_traced_memory()[1], frame['peak'])
+                memory = max(peak - frame['start'], 0)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            with self.lock:
+                stats = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                      'peak_memory_mb': 0.0})
+                stats['calls'] += 1
+                stats['wall_s'] += wall
+                stats['cpu_s'] += cpu
+                stats['peak_memory_mb'] = max(stats['peak_memory_mb'], memory / 1e6)
+    
+    @contextlib.contextmanager
+    def session(self, hook=None, output=None):
+        """
+        Encadre toute l'exécution, avec un profilage optionnel : `hook` vaut 'cprofile' ou
+        'pyinstrument' (facultatif), le profil étant écrit dans `output` s'il est indiqué
+        """
+        if hook == 'cprofile':
+            import cProfile
+            import pstats
+            profile = cProfile.Profile()
+            profile.enable()
+        elif hook == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                sys.exit("❌ pyinstrument n'est pas installé (pip install pyinstrument)")
+            profile = Profiler()
+            profile.start()
+        self.wall_start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_time = time.perf_counter() - self.wall_start
+            if hook == 'cprofile':
+                profile.disable()
+                if output:
+                    profile.dump_stats(output)
+                pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+            elif hook == 'pyinstrument':
+                profile.stop()
+                if output:
+                    with open(output, 'w', encoding='utf-8') as f:
+                        f.write(profile.output_html())
+                print(profile.output_text(unicode=True))
+    
+    def report(self, **metadata):
+        """Rapport d'exécution : métadonnées, durée totale, pic de mémoire résidente et étapes"""
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self.wall_start
+        max_rss = None
+        if resource is not None:
+            # ru_maxrss est en kilo-octets sous Linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+        return {'started': self.started.isoformat(timespec='seconds'), **metadata,
+                'wall_s': wall_time, 'max_rss_mb': max_rss,
+                'stages': {name: dict(stats) for name, stats in sorted(self.stages.items())}}
+    
+    def write_json(self, path, **metadata):
+        """Écrit le rapport d'exécution en JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(**metadata), f, indent=2, ensure_ascii=False)
+    
+    def write_prometheus(self, path, prefix='euronext_vat'):
+        """
+        Écrit les mesures au format texte de Prometheus (collecteur textfile de node_exporter),
+        via un fichier temporaire renommé pour que le collecteur ne lise jamais un fichier partiel
+        """
+        report = self.report()
+        metrics = [('stage_calls_total', 'calls', 'counter', "Nombre d'appels par étape"),
+                   ('stage_wall_seconds', 'wall_s', 'gauge', "Temps réel cumulé par étape"),
+                   ('stage_cpu_seconds', 'cpu_s', 'gauge', "Temps CPU cumulé par étape"),
+                   ('stage_peak_memory_megabytes', 'peak_memory_mb', 'gauge', "Pic mémoire par étape")]
+        lines = []
+        for metric, key, kind, description in metrics:
+            lines += [f"# HELP {prefix}_{metric} {description}", f"# TYPE {prefix}_{metric} {kind}"]
+            lines += [f'{prefix}_{metric}{{stage="{name}"}} {stats[key]:g}' for name, stats in report['stages'].items()]
+        lines += [f"# HELP {prefix}_run_wall_seconds Durée totale de l'exécution",
+                  f"# TYPE {prefix}_run_wall_seconds gauge", f"{prefix}_run_wall_seconds {report['wall_s']:g}"]
+        if report['max_rss_mb'] is not None:
+            lines += [f"# HELP {prefix}_run_max_rss_megabytes Pic de mémoire résidente du processus",
+                      f"# TYPE {prefix}_run_max_rss_megabytes gauge",
+                      f"{prefix}_run_max_rss_megabytes {report['max_rss_mb']:g}"]
+        
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary, path)
+    
+    def merge(self, stages):
+        """Ajoute les mesures d'étapes effectuées ailleurs (processus de rendu, par exemple)"""
+        with self.lock:
+            for name, other in stages.items():
+                stats = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                      'peak_memory_mb': 0.0})
+                for key in ('calls', 'wall_s', 'cpu_s'):
+                    stats[key] += other[key]
+                stats['peak_memory_mb'] = max(stats['peak_memory_mb'], other['peak_memory_mb'])
+    
+    def summary(self):
+        """Tableau des étapes, triées par temps réel décroissant"""
+        table = pd.DataFrame.from_dict(self.stages, orient='index')
+        return table.sort_values('wall_s', ascending=False) if len(table) else table
+
+
+class NoStageProfiler:
+    """Instrumentation inactive (par défaut) : les étapes ne sont pas mesurées"""
+    
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+
+class SeriesCache:
+    """
+    Cache disque (SQLite) des séries annuelles par (entreprise, indicateur, version de source)
+    
+    Les entrées expirent après `ttl` secondes et les moins récemment utilisées sont
+    évincées au-delà de `max_entries`. Le même fichier conserve les pages publiées téléchargées
+    avec leurs validateurs HTTP (ETag, Last-Modified) pour les requêtes conditionnelles.
+    
+    Les écritures (nouvelles séries, dates d'accès) sont regroupées dans une transaction validée
+    tous les `batch_size` changements et à la fermeture (`flush`, `close`) ; l'éviction n'a lieu
+    qu'à ces validations, lorsque le cache dépasse `max_entries`.
+    """
+    
+    def __init__(self, path='euronext_vat_cache.sqlite', ttl=7 * 24 * 3600, max_entries=100000, refresh=False,
+                 batch_size=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.batch_size = batch_size
+        self.refreshed = set()  # Clés déjà régénérées pendant cette exécution (--refresh)
+        self.accessed = []      # Dates d'accès à reporter à la prochaine validation
+        self.pending = 0        # Séries écrites depuis la dernière validation
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS series ("
+            "company TEXT, metric TEXT, version TEXT, payload TEXT, "
+            "created REAL, accessed REAL, PRIMARY KEY (company, metric, version))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS series_accessed ON series (accessed)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB, fetched REAL)"
+        )
+        self.connection.commit()
+        self.size = self.connection.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+    
+    def get(self, company, metric, version):
+        """Retourne la série en cache, ou None si absente, expirée ou pas encore régénérée (--refresh)"""
+        with self.lock:
+            key = (company, metric, version)
+            if self.refresh and key not in self.refreshed:
+                self.misses += 1
+                return None
+            row = self.connection.execute(
+                "SELECT payload, created FROM series WHERE company = ? AND metric = ? AND version = ?", key
+            ).fetchone()
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            self.accessed.append((now, *key))
+            self.hits += 1
+            if len(self.accessed) + self.pending >= self.batch_size:
+                self._flush()
+            return json.loads(row[0])
+    
+    def put(self, company, metric, version, series):
+        """Enregistre une série (validée avec le lot en cours)"""
+        with self.lock:
+            now = time.time()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?, ?)",
+                (company, metric, version, json.dumps(series), now, now)
+            )
+            self.refreshed.add((company, metric, version))
+            self.pending += 1
+            self.size += 1  # Majorant (un remplacement n'agrandit pas le cache), corrigé à l'éviction
+            if len(self.accessed) + self.pending >= self.batch_size:
+                self._flush()
+    
+    def flush(self):
+        """Valide le lot en cours : dates d'accès, nouvelles séries et éviction si nécessaire"""
+        with self.lock:
+            self._flush()
+    
+    def _flush(self):
+        if self.accessed:
+            self.connection.executemany(
+                "UPDATE series SET accessed = ? WHERE company = ? AND metric = ? AND version = ?", self.accessed
+            )
+        if self.max_entries is not None and self.size > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM series WHERE rowid IN (SELECT rowid FROM series "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,)
+            )
+            self.size = self.connection.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+        self.connection.commit()
+        self.accessed = []
+        self.pending = 0
+    
+    def get_page(self, url):
+        """Dernière copie d'une page et ses validateurs, ou None (ignorée avec --refresh)"""
+        if self.refresh:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, body FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return None if row is None else {'etag': row[0], 'last_modified': row[1], 'body': row[2]}
+    
+    def put_page(self, url, etag, last_modified, body):
+        """Enregistre une page et ses validateurs"""
+        with self.lock:
+            self.connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                                    (url, etag, last_modified, body, time.time()))
+            self.connection.commit()
+    
+    def invalidate(self, company=None, metric=None):
+        """Supprime les entrées d'une entreprise et/ou d'un indicateur (tout le cache par défaut)"""
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM series WHERE (? IS NULL OR company = ?) AND (? IS NULL OR metric = ?)",
+                (company, company, metric, metric)
+            )
+            self.connection.commit()
+            self.size = self.connection.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+    
+    def close(self):
+        """Valide le lot en cours puis ferme la base (sans effet si elle est déjà fermée)"""
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+
+class RenderCache:
+    """
+    Cache disque des graphiques rendus : empreinte (SHA-256) des données tracées et des
+    paramètres de rendu de chaque fichier produit
+    
+    Un graphique n'est redessiné que si son empreinte a changé ou si le fichier a disparu.
+    Chaque empreinte est un petit fichier remplacé atomiquement : les processus de rendu
+    parallèles n'écrivent jamais la même entrée.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+    
+    @staticmethod
+    def key(*parts):
+        """Empreinte de contenu : DataFrame et Series par hachage pandas, autres valeurs par repr"""
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, pd.DataFrame):
+                digest.update(repr(list(part.columns)).encode())
+                digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+            elif isinstance(part, pd.Series):
+                digest.update(repr(part.name).encode())
+                digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            else:
+                digest.update(repr(part).encode())
+        return digest.hexdigest()
+    
+    def _entry(self, path):
+        return os.path.join(self.directory, os.path.basename(path) + '.sha256')
+    
+    def is_current(self, path, key):
+        """Vrai si le fichier existe et a été rendu à partir des mêmes entrées"""
+        try:
+            with open(self._entry(path), encoding='ascii') as handle:
+                return handle.read() == key and os.path.exists(path)
+        except FileNotFoundError:
+            return False
+    
+    def put(self, path, key):
+        """Enregistre l'empreinte d'un fichier qui vient d'être rendu"""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = self._entry(path)
+        temporary = f"{entry}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='ascii') as handle:
+            handle.write(key)
+        os.replace(temporary, entry)
+
+
+class DatasetIndex:
+    """
+    Vue indexée du jeu de données : lignes triées par (entreprise, année) et bornes de la
+    tranche de chaque entreprise, pour un accès en O(1) par entreprise et en O(log n) par
+    (entreprise, année) au lieu d'un filtrage par masque booléen sur tout le DataFrame
+    """
+    
+    def __init__(self, df):
+        codes = self._company_codes(df)
+        years = df['Year'].to_numpy()
+        same_company = codes[1:] == codes[:-1]
+        if (np.diff(codes) < 0).any() or (same_company & (np.diff(years) <= 0)).any():
+            df = df.sort_values(['Company', 'Year'], kind='stable')
+            codes = self._company_codes(df)
+        self.df = df.reset_index(drop=True)
+        self.years = self.df['Year'].to_numpy()
+        
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=int)
+        stops = np.r_[starts[1:], len(codes)]
+        names = self.df['Company'].to_numpy()[starts]
+        self.slices = {str(name): (start, stop) for name, start, stop in zip(names, starts, stops)}
+    
+    @staticmethod
+    def _company_codes(df):
+        if isinstance(df['Company'].dtype, pd.CategoricalDtype):
+            return df['Company'].cat.codes.to_numpy()
+        return pd.factorize(df['Company'], sort=True)[0]
+    
+    def company(self, name):
+        """Lignes d'une entreprise, triées par année (DataFrame vide si inconnue)"""
+        start, stop = self.slices.get(name, (0, 0))
+        return self.df.iloc[start:stop]
+    
+    def row(self, name, year):
+        """Ligne (entreprise, année), ou None si absente"""
+        start, stop = self.slices.get(name, (0, 0))
+        i = start + np.searchsorted(self.years[start:stop], year)
+        if i < stop and self.years[i] == year:
+            return self.df.iloc[i]
+        return None
+
+
+class AggregateCube:
+    """
+    Cube d'agrégats précalculés (secteur × pays × année) de tous les indicateurs
+    
+    Chaque combinaison de dimensions (y compris le total général) est agrégée une seule
+    fois ; les rapports interrogent ensuite le cube par index au lieu de parcourir le DataFrame.
+    """
+    
+    DIMENSIONS = ('Sector', 'Country', 'Year')
+    
+    # Montants en devise d'origine et cours de change : non additionnables entre devises
+    EXCLUDED = ('VAT Paid (M, local)', 'Revenue (M, local)', 'Profit (M, local)', 'FX Rate (per €)')
+    
+    def __init__(self, df, metrics=None):
+        if metrics is None:
+            metrics = [column for column in df.columns
+                       if column not in self.DIMENSIONS and column not in self.EXCLUDED
+                       and pd.api.types.is_float_dtype(df[column])]
+        self.metrics = list(metrics)
+        self.levels = {}
+        for n_dims in range(len(self.DIMENSIONS) + 1):
+            for dims in itertools.combinations(self.DIMENSIONS, n_dims):
+                self.levels[dims] = self._aggregate(df, list(dims))
+    
+    def _aggregate(self, df, dims):
+        """Statistiques (effectif, moyenne, écart-type, quartiles, extrêmes, somme) par groupe"""
+        if not dims:
+            stats = df[self.metrics].describe().T
+            stats['sum'] = df[self.metrics].sum()
+            return stats.stack().to_frame().T
+        # Agrégations vectorisées (groupby.describe() appliquerait describe() groupe par groupe)
+        grouped = df.groupby(dims, observed=True)[self.metrics]
+        stats = grouped.agg(['count', 'mean', 'std', 'min', 'max', 'sum'])
+        quantiles = grouped.quantile([0.25, 0.5, 0.75]).unstack(level=-1)
+        quantiles.columns = pd.MultiIndex.from_tuples([(metric, f'{q * 100:g}%') for metric, q in quantiles.columns])
+        return pd.concat([stats, quantiles], axis=1).sort_index(axis=1)
+    
+    def _level(self, dims):
+        return self.levels[tuple(dim for dim in self.DIMENSIONS if dim in dims)]
+    
+    def table(self, dims, metric, stat='mean'):
+        """Série d'une statistique indexée par les dimensions demandées (ex. ('Sector', 'Year'))"""
+        return self._level(dims)[(metric, stat)]
+    
+    def value(self, metric, stat='mean', **coords):
+        """Valeur d'une statistique pour une cellule du cube (ex. Sector='Luxe', Year=2025)"""
+        dims = tuple(dim for dim in self.DIMENSIONS if dim in coords)
+        level = self._level(dims)
+        if not dims:
+            return level[(metric, stat)].iloc[0]
+        key = tuple(coords[dim] for dim in dims)
+        return level.at[key if len(key) > 1 else key[0], (metric, stat)]
+    
+    def describe(self, metrics):
+        """Équivalent de DataFrame.describe() sur l'ensemble des données"""
+        stats = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+        overall = self.levels[()].iloc[0]
+        return pd.DataFrame({metric: [overall[(metric, stat)] for stat in stats] for metric in metrics},
+                            index=stats)
+    
+    def box_stats(self, dim, metric):
+        """Statistiques de boîte à moustaches par modalité d'une dimension (pour Axes.bxp)"""
+        level = self.levels[(dim,)]
+        boxes = []
+        for label, row in level.iterrows():
+            q1, median, q3 = row[(metric, '25%')], row[(metric, '50%')], row[(metric, '75%')]
+            iqr = q3 - q1
+            boxes.append({'label': label, 'med': median, 'q1': q1, 'q3': q3,
+                          'whislo': max(row[(metric, 'min')], q1 - 1.5 * iqr),
+                          'whishi': min(row[(metric, 'max')], q3 + 1.5 * iqr), 'fliers': []})
+        return boxes
+
+
+class OnlineStatistics:
+    """
+    Statistiques descriptives mises à jour bloc par bloc, en mémoire bornée
+    
+    Effectif, moyenne et écart-type sont fusionnés par la formule de Chan (Welford par blocs),
+    minimum et maximum exactement ; les quartiles sont estimés sur un échantillon uniforme de
+    taille fixe (exacts tant que le nombre de lignes ne dépasse pas `sample_size`).
+    """
+    
+    def __init__(self, metrics, sample_size=100000, seed=0):
+        self.metrics = list(metrics)
+        self.count = 0
+        self.mean = np.zeros(len(self.metrics))
+        self.m2 = np.zeros(len(self.metrics))
+        self.min = np.full(len(self.metrics), np.inf)
+        self.max = np.full(len(self.metrics), -np.inf)
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.sample_keys = np.empty(0)
+        self.sample = np.empty((0, len(self.metrics)))
+    
+    def update(self, df):
+        """Intègre un bloc de lignes"""
+        values = df[self.metrics].to_numpy(dtype=float)
+        n = len(values)
+        if n == 0:
+            return
+        chunk_mean = values.mean(axis=0)
+        chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+        delta = chunk_mean - self.mean
+        total = self.count + n
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+        
+        # Échantillonnage « bottom-k » : chaque ligne reçoit une clé aléatoire, on garde les k plus petites
+        keys = np.concatenate([self.sample_keys, self.rng.random(n)])
+        sample = np.concatenate([self.sample, values])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, sample = keys[keep], sample[keep]
+        self.sample_keys, self.sample = keys, sample
+    
+    def describe(self):
+        """Équivalent de DataFrame.describe() sur toutes les lignes vues"""
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.full(len(self.metrics), np.nan)
+        quartiles = (np.quantile(self.sample, [0.25, 0.5, 0.75], axis=0) if self.count
+                     else np.full((3, len(self.metrics)), np.nan))
+        rows = [np.full(len(self.metrics), float(self.count)), self.mean, std, self.min, *quartiles, self.max]
+        return pd.DataFrame(rows, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+                            columns=self.metrics)
+
+
+class StreamingTopN:
+    """
+    Classement des N plus grandes valeurs d'un indicateur, maintenu au fil des blocs dans un
+    tas de taille N (seuls les N meilleurs candidats de chaque bloc sont examinés)
+    """
+    
+    def __init__(self, metric, n=10, columns=('Company', 'Sector', 'Country', 'Year')):
+        self.metric = metric
+        self.n = n
+        self.columns = list(columns)
+        self.heap = []
+        self.counter = itertools.count()
+    
+    def update(self, df):
+        """Intègre un bloc de lignes"""
+        values = df[self.metric].to_numpy(dtype=float)
+        candidates = np.flatnonzero(~np.isnan(values))
+        if len(candidates) > self.n:
+            candidates = candidates[np.argpartition(values[candidates], -self.n)[-self.n:]]
+        if len(candidates) == 0:
+            return
+        records = df.iloc[candidates][self.columns].to_dict('records')
+        for value, record in zip(values[candidates], records):
+            self.push(value, record)
+    
+    def push(self, value, record):
+        """Propose une ligne au classement (ignorée si elle ne bat pas le N-ième)"""
+        # Le compteur départage les ex aequo : le premier rencontré reste devant
+        item = (value, -next(self.counter), record)
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:
+            heapq.heapreplace(self.heap, item)
+    
+    def result(self):
+        """Classement décroissant sous forme de DataFrame"""
+        ranked = sorted(self.heap, reverse=True)
+        return pd.DataFrame([{**record, self.metric: value} for value, _, record in ranked],
+                            columns=list(dict.fromkeys(self.columns + [self.metric])))
+
+
+class Leaderboards:
+    """
+    Classements top-N de plusieurs indicateurs, pour chaque année : global, par secteur et par pays
+    
+    Les blocs de lignes sont intégrés en une seule passe au fil de leur production ; chaque
+    classement est un tas de taille N, si bien que les rapports lisent leurs classements sans
+    extraire ni reparcourir la tranche de l'année.
+    """
+    
+    METRICS = ('VAT Paid (M€)', 'Total Tax Burden/Revenue (%)', 'VAT/Revenue Ratio (%)')
+    DIMENSIONS = ('Sector', 'Country')
+    COLUMNS = ('Company', 'Sector', 'Country', 'Year', 'VAT Paid (M€)', 'VAT/Revenue Ratio (%)',
+               'Effective Tax Rate (%)', 'Total Tax Burden/Revenue (%)')
+    
+    def __init__(self, n=10, metrics=METRICS, dimensions=DIMENSIONS, columns=COLUMNS):
+        self.n = n
+        self.metrics = list(metrics)
+        self.dimensions = list(dimensions)
+        self.columns = list(dict.fromkeys([*columns, *self.metrics]))
+        self.boards = {}
+    
+    def update(self, df):
+        """Intègre un bloc de lignes dans tous les classements"""
+        for metric in self.metrics:
+            ordered = df[df[metric].notna()].sort_values(metric, ascending=False, kind='stable')
+            for dim in [None] + self.dimensions:
+                # Présélection vectorisée : au plus N candidats par groupe (année, modalité)
+                keys = ['Year'] if dim is None else ['Year', dim]
+                candidates = ordered[ordered.groupby(keys, observed=True).cumcount() < self.n]
+                for record in candidates[self.columns].to_dict('records'):
+                    key = (metric, dim, record[dim] if dim else None, record['Year'])
+                    board = self.boards.get(key)
+                    if board is None:
+                        board = self.boards[key] = StreamingTopN(metric, self.n, self.columns)
+                    board.push(record[metric], record)
+    
+    def top(self, metric, year, n=None, sector=None, country=None):
+        """Classement d'un indicateur pour une année, global ou limité à un secteur ou à un pays"""
+        if sector is not None:
+            key = (metric, 'Sector', sector, year)
+        elif country is not None:
+            key = (metric, 'Country', country, year)
+        else:
+            key = (metric, None, None, year)
+        board = self.boards.get(key)
+        ranking = board.result() if board is not None else pd.DataFrame(columns=self.columns)
+        return ranking[self.columns].head(n or self.n).reset_index(drop=True)
+
+
+def years_key(years):
+    """Identifiant compact d'un ensemble d'années (plage « 2002-2025 » ou liste explicite)"""
+    years = [int(year) for year in years]
+    if years == list(range(years[0], years[-1] + 1)):
+        return f"{years[0]}-{years[-1]}"
+    return ','.join(map(str, years))
+
+
+def profiled(method):
+    """Décorateur mesurant chaque appel d'une méthode comme une étape du profileur de l'analyseur"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.profiler.stage(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def cached_series(metric):
+    """
+    Décorateur plaçant un getter get_company_* derrière la mémoire de l'exécution
+    et le cache disque de l'analyseur
+    """
+    def decorator(getter):
+        @functools.wraps(getter)
+        def wrapper(self, company, years=None):
+            years = self.years if years is None else np.asarray(years)
+            # Les séries simulées dépendent aussi de la graine et de la ligne du registre
+            version = f"{self.source_version}:{years_key(years)}:seed{self.seed}:{self.companies.row_key(company)}"
+            key = (company, metric, version)
+            with self._series_lock:
+                lock = self._series_locks.setdefault(key, threading.Lock())
+            with lock:
+                if key in self._series:
+                    return self._series[key]
+                series = None if self.cache is None else self.cache.get(company, metric, version)
+                if series is None:
+                    series = getter(self, company, years)
+                    if self.cache is not None:
+                        self.cache.put(company, metric, version, series)
+                self._series[key] = series
+                return series
+        return wrapper
+    return decorator
+
+
+class SimulationEngine:
+    """
+    Moteur de simulation vectorisé : tire en une seule fois tous les chocs de
+    croissance, de bruit et de marge pour N entreprises × Y années
+    """
+    
+    # Ajustements de croissance lors des crises économiques (année -> choc)
+    VAT_CRISES = {2008: -0.15, 2009: -0.15, 2020: -0.10}       # Crise financière, COVID-19
+    REVENUE_CRISES = {2008: -0.12, 2009: -0.12, 2020: -0.08}
+    
+    def __init__(self, seed=None, start_year=2002, end_year=2025, base_year=2002):
+        self.rng = np.random.default_rng(seed)
+        self.base_year = base_year  # Année de référence de la capitalisation (exposant de croissance nul)
+        self.years = np.arange(start_year, end_year + 1)
+    
+    def _years(self, years):
+        """Années à simuler : la plage configurée par défaut, ou un sous-ensemble quelconque"""
+        return self.years if years is None else np.asarray(years)
+    
+    @staticmethod
+    def _draw(rng, method, shape, *args):
+        """
+        Tirages de forme (entreprises, années) : d'un seul générateur, ou d'une liste de générateurs
+        dont chacun fournit la ligne de son entreprise (mêmes valeurs qu'une simulation entreprise
+        par entreprise avec ces générateurs)
+        """
+        if isinstance(rng, np.random.Generator):
+            return getattr(rng, method)(*args, size=shape)
+        rows = [getattr(generator, method)(*args, size=(1,) + shape[1:]) for generator in rng]
+        return np.concatenate(rows) if rows else np.empty(shape)
+    
+    def _crisis_adjustment(self, crises, years):
+        """Vecteur d'ajustement de croissance par année (masques des années de crise)"""
+        adjustment = np.zeros(len(years))
+        for year, shock in crises.items():
+            adjustment[years == year] += shock
+        return adjustment
+    
+    def _growth_series(self, base, mean, std, crises, floor, years, rng=None, base_year=None):
+        """
+        Séries à croissance aléatoire composée avec bruit de 10% et plancher, à partir de `base`
+        en `base_year` (par défaut l'année de référence de la capitalisation)
+        """
+        rng = self.rng if rng is None else rng
+        base_year = self.base_year if base_year is None else base_year
+        shape = (len(base), len(years))
+        growth = self._draw(rng, 'normal', shape, mean, std) + self._crisis_adjustment(crises, years)
+        values = base[:, None] * (1 + growth) ** (years - base_year)
+        noise = self._draw(rng, 'standard_normal', shape) * np.abs(values) * 0.1
+        return np.maximum(floor, values + noise)
+    
+    def simulate_vat(self, base_vat, years=None, rng=None, base_year=None):
+        """TVA simulée (M€) : croissance moyenne de 5%"""
+        return self._growth_series(np.asarray(base_vat, dtype=float), 0.05, 0.03, self.VAT_CRISES, 10,
+                                   self._years(years), rng, base_year)
+    
+    def simulate_revenue(self, base_revenue, years=None, rng=None, base_year=None):
+        """Chiffre d'affaires simulé (M€) : croissance moyenne de 6%"""
+        return self._growth_series(np.asarray(base_revenue, dtype=float), 0.06, 0.04, self.REVENUE_CRISES, 100,
+                                   self._years(years), rng, base_year)
+    
+    def simulate_profit(self, revenue, margin, rng=None):
+        """Bénéfice simulé (M€) : marge sectorielle avec variation aléatoire"""
+        rng = self.rng if rng is None else rng
+        revenue = np.asarray(revenue, dtype=float)
+        margin_variation = self._draw(rng, 'normal', revenue.shape, 0, 0.03)
+        return revenue * (np.asarray(margin, dtype=float)[:, None] + margin_variation)
+    
+    def simulate_tax_rate(self, base_rate, years=None, rng=None, base_year=None):
+        """Taux effectif d'imposition simulé (%) : tendance de +0.2 pt/an, borné à [15, 50]"""
+        rng = self.rng if rng is None else rng
+        years = self._years(years)
+        base_rate = np.asarray(base_rate, dtype=float)
+        trend = (years - (self.base_year if base_year is None else base_year)) * 0.2
+        variation = self._draw(rng, 'normal', (len(base_rate), len(years)), 0, 1.0)
+        return np.clip(base_rate[:, None] + trend + variation, 15.0, 50.0)
+    
+    def simulate_block(self, base_vat, base_revenue, margin, base_rate, years=None, rngs=None):
+        """
+        Simule toutes les séries d'un univers et retourne un bloc colonnaire
+        (tableaux aplatis entreprise × année, dans l'ordre des entreprises)
+        
+        `rngs` associe à chaque indicateur ('vat', 'revenue', 'profit', 'tax_rate') un générateur
+        ou une liste de générateurs par entreprise ; par défaut, le générateur du moteur.
+        """
+        years = self._years(years)
+        rngs = rngs or {}
+        vat = self.simulate_vat(base_vat, years, rngs.get('vat'))
+        revenue = self.simulate_revenue(base_revenue, years, rngs.get('revenue'))
+        profit = self.simulate_profit(revenue, margin, rngs.get('profit'))
+        tax_rate = self.simulate_tax_rate(base_rate, years, rngs.get('tax_rate'))
+        
+        return {
+            'Year': np.tile(years, len(vat)),
+            'VAT Paid (M€)': vat.ravel(),
+            'Revenue (M€)': revenue.ravel(),
+            'Profit (M€)': profit.ravel(),
+            'Effective Tax Rate (%)': tax_rate.ravel(),
+        }
+
+
+# Style des graphiques déjà appliqué dans ce processus (voir EuronextVATAnalysis._pyplot)
+_plot_style_applied = False
+
+
 class EuronextVATAnalysis:
-    def __init__(self):
+    # Séries annuelles récupérées pour chaque entreprise
+    SERIES_COLUMNS = ['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 'Effective Tax Rate (%)']
+    
+    # Montants convertis en euros, conservés aussi dans la devise de publication de l'entreprise
+    LOCAL_COLUMNS = {'VAT Paid (M€)': 'VAT Paid (M, local)', 'Revenue (M€)': 'Revenue (M, local)',
+                     'Profit (M€)': 'Profit (M, local)'}
+    
+    # Version des sources de données : à incrémenter pour invalider le cache disque
+    SOURCE_VERSION = '2'
+    
+    # Version du code des graphiques : à incrémenter pour invalider le cache de rendu
+    RENDER_VERSION = '2'
+    
+    # Colonnes tracées dans le rapport d'une entreprise (empreinte du cache de rendu)
+    COMPANY_PLOT_COLUMNS = ['Year', 'VAT Paid (M€)', 'Revenue (M€)', 'VAT/Revenue Ratio (%)',
+                            'Total Tax Burden/Revenue (%)', 'Profit (M€)', 'Tax Paid (M€)',
+                            'Effective Tax Rate (%)', 'Country VAT Rate (%)']
+    
+    def __init__(self, seed=None, throttle=True, rate_limiter=None, max_workers=1, per_host_limit=4,
+                 cache=None, reference=None, sources=None, parameters=None, vat_schedule=None, registry=None,
+                 fx_rates=None, start_year=2002, end_year=2025,
+                 headless=False, dpi=300, figure_format='png', output_dir='.', render_cache=None, profiler=None,
+                 retries=3, backoff_factor=0.5):
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        # Liste des principales entreprises d'Euronext avec leurs secteurs et pays
-        self.companies = {
-            'LVMH': {'sector': 'Luxe', 'country': 'France', 'market_cap': 380e9},
-            'L\'Oréal': {'sector': 'Cosmétiques', 'country': 'France', 'market_cap': 240e9},
-            'TotalEnergies': {'sector': 'Énergie', 'country': 'France', 'market_cap': 160e9},
-            'Sanofi': {'sector': 'Pharmaceutique', 'country': 'France', 'market_cap': 120e9},
-            'Air Liquide': {'sector': 'Industrie', 'country': 'France', 'market_cap': 95e9},
-            'BNP Paribas': {'sector': 'Banque', 'country': 'France', 'market_cap': 75e9},
-            'Airbus': {'sector': 'Aéronautique', 'country': 'Pays-Bas', 'market_cap': 120e9},
-            'Unibail-Rodamco-Westfield': {'sector': 'Immobilier', 'country': 'France', 'market_cap': 12e9},
-            'Kering': {'sector': 'Luxe', 'country': 'France', 'market_cap': 75e9},
-            'Hermès': {'sector': 'Luxe', 'country': 'France', 'market_cap': 220e9},
-            'Schneider Electric': {'sector': 'Équipement électrique', 'country': 'France', 'market_cap': 120e9},
-            'Vinci': {'sector': 'Construction', 'country': 'France', 'market_cap': 65e9},
-            'Danone': {'sector': 'Agroalimentaire', 'country': 'France', 'market_cap': 40e9},
-            'Safran': {'sector': 'Aéronautique', 'country': 'France', 'market_cap': 85e9},
-            'EssilorLuxottica': {'sector': 'Optique', 'country': 'France', 'market_cap': 95e9},
-            'AXA': {'sector': 'Assurance', 'country': 'France', 'market_cap': 70e9},
-            'Société Générale': {'sector': 'Banque', 'country': 'France', 'market_cap': 25e9},
-            'Carrefour': {'sector': 'Distribution', 'country': 'France', 'market_cap': 12e9},
-            'Orange': {'sector': 'Télécommunications', 'country': 'France', 'market_cap': 30e9},
-            'Engie': {'sector': 'Énergie', 'country': 'France', 'market_cap': 40e9},
-            'Pernod Ricard': {'sector': 'Spiritueux', 'country': 'France', 'market_cap': 45e9},
-            'STMicroelectronics': {'sector': 'Semi-conducteurs', 'country': 'Suisse', 'market_cap': 40e9},
-            'Capgemini': {'sector': 'Services informatiques', 'country': 'France', 'market_cap': 35e9},
-            'Legrand': {'sector': 'Équipement électrique', 'country': 'France', 'market_cap': 25e9},
-            'Publicis': {'sector': 'Communication', 'country': 'France', 'market_cap': 25e9}
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
         }
+        # Registre des entreprises suivies (CompanyRegistry), par défaut les principales valeurs d'Euronext
+        self.companies = registry if registry is not None else CompanyRegistry.load()
         
-        # Taux de TVA standard par pays (en %)
-        self.vat_rates = {
-            'France': {'2002': 19.6, '2003': 19.6, '2004': 19.6, '2005': 19.6,
-                      '2006': 19.6, '2007': 19.6, '2008': 19.6, '2009': 19.6,
-                      '2010': 19.6, '2011': 19.6, '2012': 19.6, '2013': 19.6,
-                      '2014': 20.0, '2015': 20.0, '2016': 20.0, '2017': 20.0,
-                      '2018': 20.0, '2019': 20.0, '2020': 20.0, '2021': 20.0,
-                      '2022': 20.0, '2023': 20.0, '2024': 20.0, '2025': 20.0},
-            'Pays-Bas': {'2002': 19.0, '2003': 19.0, '2004': 19.0, '2005': 19.0,
-                        '2006': 19.0, '2007': 19.0, '2008': 19.0, '2009': 19.0,
-                        '2010': 19.0, '2011': 19.0, '2012': 21.0, '2013': 21.0,
-                        '2014': 21.0, '2015': 21.0, '2016': 21.0, '2017': 21.0,
-                        '2018': 21.0, '2019': 21.0, '2020': 21.0, '2021': 21.0,
-                        '2022': 21.0, '2023': 21.0, '2024': 21.0, '2025': 21.0},
-            'Suisse': {'2002': 7.6, '2003': 7.6, '2004': 7.6, '2005': 7.6,
-                      '2006': 7.6, '2007': 7.6, '2008': 7.6, '2009': 7.6,
-                      '2010': 7.6, '2011': 8.0, '2012': 8.0, '2013': 8.0,
-                      '2014': 8.0, '2015': 8.0, '2016': 8.0, '2017': 8.0,
-                      '2018': 7.7, '2019': 7.7, '2020': 7.7, '2021': 7.7,
-                      '2022': 7.7, '2023': 8.1, '2024': 8.1, '2025': 8.1}
-        }
+        # Graine de l'analyseur et séquence dont dérivent les flux aléatoires propres à chaque
+        # (entreprise, indicateur) : mêmes séries quel que soit l'ordre des threads ou des processus
+        self.seed = seed
+        self.seed_sequence = np.random.SeedSequence(seed)
+        
+        # Plage d'années analysée (configurable pour prolonger le jeu de données au-delà de 2025)
+        self.start_year = start_year
+        self.end_year = end_year
+        self.years = np.arange(start_year, end_year + 1)
+        
+        # Rendu des graphiques : mode sans affichage (backend Agg), résolution et format des fichiers
+        self.headless = headless
+        self.dpi = dpi
+        self.figure_format = figure_format
+        self.output_dir = output_dir
+        
+        # Cache de rendu (RenderCache) : graphiques inchangés non redessinés, en mode sans affichage
+        self.render_cache = render_cache
+        
+        # Instrumentation des étapes (StageProfiler), inactive par défaut
+        self.profiler = profiler if profiler is not None else NoStageProfiler()
+        
+        # Moteur de simulation vectorisé (graine optionnelle pour la reproductibilité)
+        self.engine = SimulationEngine(seed=seed, start_year=start_year, end_year=end_year)
+        
+        # Limitation du débit des requêtes distantes uniquement (les données locales ne sont pas freinées)
+        if rate_limiter is None:
+            rate_limiter = TokenBucketRateLimiter(rate=10.0) if throttle else NoRateLimiter()
+        self.rate_limiter = rate_limiter
+        
+        # Collecte concurrente : pool de travailleurs borné et connexions HTTP réutilisées
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+        self._host_semaphores = {}
+        self._host_lock = threading.Lock()
+        
+        # Cache disque optionnel des séries (SeriesCache)
+        self.cache = cache
+        
+        # Séries historiques de référence et version des sources (clé du cache)
+        self.reference = reference if reference is not None else ReferenceStore.load()
+        self.source_version = f"{self.SOURCE_VERSION}-ref{self.reference.version}"
+        
+        # Paramètres du modèle par secteur et par pays (ModelParameters) et bases calculées par entreprise
+        self.parameters = parameters if parameters is not None else ModelParameters.load()
+        self.source_version += f"-par{self.parameters.version}.{self.parameters.digest}"
+        self._bases, self._bases_source = {}, None
+        
+        # Barème des taux de TVA par pays (VATSchedule), au mois près
+        self.vat_schedule = vat_schedule if vat_schedule is not None else VATSchedule.load()
+        
+        # Cours de change moyens annuels (FXRates), pour ramener les montants en euros
+        self.fx_rates = fx_rates if fx_rates is not None else FXRates.load()
+        
+        # Tableaux financiers publiés à ingérer (ReportSources) et séries déjà extraites par entreprise
+        self.sources = sources if sources is not None else ReportSources.load()
+        if self.sources.sources:
+            self.source_version += f"-web{self.sources.version}"
+        self._published = {}
+        
+        # Cube d'agrégats, classements et vue indexée du dernier DataFrame analysé (construits à la demande)
+        self.cube = None
+        self.cube_source = None
+        self.boards = None
+        self.boards_source = None
+        self.index = None
+        self.index_source = None
+        
+        # Séries déjà obtenues pendant cette exécution : un même tirage simulé est réutilisé
+        # (le bénéfice s'appuie ainsi sur le chiffre d'affaires présent dans le DataFrame)
+        self._series = {}
+        self._series_locks = {}
+        self._series_lock = threading.Lock()
+    
+    @property
+    def cache_hits(self):
+        return self.cache.hits if self.cache is not None else 0
+    
+    @property
+    def cache_misses(self):
+        return self.cache.misses if self.cache is not None else 0
+    
+    @property
+    def session(self):
+        """Session HTTP partagée, créée à la première requête (requests n'est importé qu'à ce moment)"""
+        with self._host_lock:
+            if self._session is None:
+                self._session = self._create_session(pool_size=max(self.per_host_limit, self.max_workers))
+            return self._session
+    
+    def _create_session(self, pool_size):
+        """
+        Session HTTP partagée : pool de connexions persistantes, transfert compressé et nouvelles
+        tentatives avec attente exponentielle sur les erreurs de connexion et les réponses 429/5xx
+        (en respectant l'en-tête Retry-After)
+        """
+        import requests
+        from urllib3.util.retry import Retry
+        session = requests.Session()
+        session.headers.update(self.headers)
+        retry = Retry(total=self.retries, backoff_factor=self.backoff_factor,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset({'GET', 'HEAD'}),
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                                                max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def _host_semaphore(self, url):
+        """Sémaphore limitant le nombre de requêtes simultanées vers un même hôte"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_semaphores[host]
+    
+    def fetch_page(self, url, timeout=30, headers=None):
+        """Télécharge une page distante en respectant le limiteur de débit et la limite par hôte"""
+        with self._host_semaphore(url):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, timeout=timeout, headers=headers)
+        response.raise_for_status()
+        return response
+    
+    def fetch_document(self, url, timeout=30):
+        """
+        Contenu d'une page, par requête conditionnelle (If-None-Match / If-Modified-Since) lorsque
+        le cache en conserve une copie : une réponse 304 renvoie la copie sans nouveau transfert
+        """
+        cached = self.cache.get_page(url) if self.cache is not None else None
+        headers = {}
+        if cached is not None:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        response = self.fetch_page(url, timeout, headers)
+        if response.status_code == 304 and cached is not None:
+            return cached['body']
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if self.cache is not None and (etag or last_modified):
+            self.cache.put_page(url, etag, last_modified, response.content)
+        return response.content
+    
+    def published_series(self, metric, company, years=None):
+        """
+        Valeurs publiées d'un indicateur {année: valeur} pour les années couvertes par la source
+        de l'entreprise (page téléchargée et analysée une seule fois) ; {} sans source ou en cas d'échec
+        """
+        source = self.sources.sources.get(company)
+        if source is None:
+            return {}
+        with self._series_lock:
+            lock = self._series_locks.setdefault(('published', company), threading.Lock())
+        with lock:
+            if company not in self._published:
+                try:
+                    self._published[company] = self.sources.parse(self.fetch_document(source['url']), source)
+                except Exception as e:
+                    print(f"❌ Erreur source publiée pour {company}: {e}")
+                    self._published[company] = {}
+        published = self._published[company].get(metric, {})
+        years = self.years if years is None else years
+        return {str(year): published[str(year)] for year in years if str(year) in published}
+    
+    def _known_or_simulated(self, metric, company, years, simulate):
+        """
+        Série de référence, puis publiée, complétée par le modèle pour les années
+        qu'aucune des deux ne couvre (la référence prévaut sur les tableaux publiés)
+        
+        Les années manquantes prolongent la série connue : elles sont simulées à partir de la
+        valeur connue la plus proche qui les précède (ou qui les suit, avant le début des données).
+        """
+        years = self.years if years is None else years
+        known = self.reference.series(metric, company, years)
+        if len(known) == len(years):
+            return known
+        known = {**self.published_series(metric, company, years), **known}
+        if len(known) == len(years):
+            return known
+        
+        # Valeurs connues sur toute la plage disponible (pas seulement les années demandées)
+        anchors = {**self.published_series(metric, company), **self.reference.series(metric, company), **known}
+        if not anchors:
+            return simulate(company, years)
+        anchor_years = np.array(sorted(int(year) for year in anchors))
+        gaps = {}
+        for year in years:
+            if str(year) not in known:
+                i = np.searchsorted(anchor_years, int(year))
+                gaps.setdefault(int(anchor_years[i - 1] if i > 0 else anchor_years[0]), []).append(int(year))
+        history = dict(known)
+        for anchor, gap_years in gaps.items():
+            history.update(simulate(company, gap_years, anchor=(anchor, anchors[str(anchor)])))
+        return {str(year): history[str(year)] for year in years}
+    
+    def fetch_pages(self, urls, timeout=30):
+        """Télécharge plusieurs pages en parallèle ; les réponses sont retournées dans l'ordre des URLs"""
+        urls = list(urls)
+        if self.max_workers <= 1:
+            return [self.fetch_page(url, timeout) for url in urls]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda url: self.fetch_page(url, timeout), urls))
+    
+    def collect_company_series(self, companies, years=None):
+        """
+        Récupère les quatre séries de chaque entreprise, en parallèle si max_workers > 1
+        
+        Les résultats sont assemblés dans l'ordre des entreprises, quel que soit l'ordre d'achèvement.
+        """
+        getters = dict(zip(self.SERIES_COLUMNS, [self.get_company_vat_data, self.get_company_revenue,
+                                                 self.get_company_profit, self.get_company_effective_tax_rate]))
+        if self.max_workers <= 1:
+            for company in companies:
+                yield {name: getter(company, years) for name, getter in getters.items()}
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [{name: pool.submit(getter, company, years) for name, getter in getters.items()}
+                       for company in companies]
+            for company_futures in futures:
+                yield {name: future.result() for name, future in company_futures.items()}
     
-    def get_company_vat_data(self, company):
+    @profiled
+    @cached_series('vat')
+    def get_company_vat_data(self, company, years=None):
         """
         Récupère les données de TVA pour une entreprise donnée
         """
         try:
-            # Données historiques approximatives de TVA payée (en millions d'euros)
-            vat_history = {
-                'LVMH': {
-                    '2002': 450, '2003': 480, '2004': 520, '2005': 580,
-                    '2006': 620, '2007': 680, '2008': 650, '2009': 600,
-                    '2010': 750, '2011': 850, '2012': 900, '2013': 950,
-                    '2014': 1050, '2015': 1200, '2016': 1250, '2017': 1350,
-                    '2018': 1500, '2019': 1600, '2020': 1400, '2021': 1800,
-                    '2022': 2100, '2023': 2300, '2024': 2500, '2025': 2700
-                },
-                'TotalEnergies': {
-                    '2002': 1800, '2003': 2000, '2004': 2200, '2005': 2400,
-                    '2006': 2600, '2007': 2800, '2008': 3000, '2009': 2500,
-                    '2010': 2800, '2011': 3200, '2012': 3400, '2013': 3600,
-                    '2014': 3500, '2015': 3200, '2016': 3000, '2017': 3300,
-                    '2018': 3800, '2019': 4000, '2020': 2800, '2021': 3800,
-                    '2022': 5500, '2023': 5200, '2024': 4800, '2025': 5000
-                },
-                'L\'Oréal': {
-                    '2002': 300, '2003': 320, '2004': 350, '2005': 380,
-                    '2006': 400, '2007': 450, '2008': 460, '2009': 440,
-                    '2010': 500, '2011': 550, '2012': 600, '2013': 650,
-                    '2014': 700, '2015': 800, '2016': 850, '2017': 900,
-                    '2018': 950, '2019': 1000, '2020': 950, '2021': 1100,
-                    '2022': 1200, '2023': 1300, '2024': 1400, '2025': 1500
-                },
-                # Ajouter des données pour les autres entreprises...
-            }
-            
-            # Si nous n'avons pas de données spécifiques, utilisons un modèle par défaut
-            if company not in vat_history:
-                # Modèle basé sur le secteur et la capitalisation
-                sector = self.companies[company]['sector']
-                market_cap = self.companies[company]['market_cap']
-                country = self.companies[company]['country']
-                
-                # Base de TVA selon le secteur
-                if sector == 'Énergie':
-                    base_vat = market_cap * 0.0015  # 0.15% de la capitalisation
-                elif sector == 'Luxe':
-                    base_vat = market_cap * 0.0008  # 0.08% de la capitalisation
-                elif sector == 'Banque':
-                    base_vat = market_cap * 0.0003  # 0.03% de la capitalisation
-                elif sector == 'Pharmaceutique':
-                    base_vat = market_cap * 0.0006  # 0.06% de la capitalisation
-                elif sector == 'Aéronautique':
-                    base_vat = market_cap * 0.0007  # 0.07% de la capitalisation
-                else:
-                    base_vat = market_cap * 0.0005  # 0.05% de la capitalisation
-                
-                # Créer des données simulées
-                vat_history[company] = {}
-                for year in range(2002, 2026):
-                    year_str = str(year)
-                    # Croissance annuelle avec variations aléatoires
-                    growth = np.random.normal(0.05, 0.03)  # Croissance moyenne de 5%
-                    # Impact des crises économiques
-                    if year == 2008 or year == 2009:  # Crise financière
-                        growth -= 0.15
-                    if year == 2020:  # COVID-19
-                        growth -= 0.10
-                    
-                    vat_value = base_vat * (1 + growth) ** (year - 2002)
-                    vat_history[company][year_str] = max(10, vat_value + np.random.normal(0, vat_value * 0.1))
+            # Référence (magasin chargé une seule fois) puis tableaux publiés, les années manquantes
+            # étant complétées par le modèle basé sur le secteur et la capitalisation
+            vat_history = self._known_or_simulated('vat', company, years,
+                                                   self._create_simulated_vat_data)
             
-            return vat_history[company]
+            return vat_history
             
         except Exception as e:
             print(f"❌ Erreur données TVA pour {company}: {e}")
-            return self._create_simulated_vat_data(company)
+            return self._create_simulated_vat_data(company, years)
     
-    def get_company_revenue(self, company):
+    @profiled
+    @cached_series('revenue')
+    def get_company_revenue(self, company, years=None):
         """
         Récupère les données de chiffre d'affaires pour une entreprise donnée
         """
         try:
-            # Données historiques approximatives de chiffre d'affaires (en millions d'euros)
-            revenue_history = {
-                'LVMH': {
-                    '2002': 12000, '2003': 12700, '2004': 14000, '2005': 15000,
-                    '2006': 16000, '2007': 17000, '2008': 17200, '2009': 17000,
-                    '2010': 20300, '2011': 23700, '2012': 28000, '2013': 29000,
-                    '2014': 30600, '2015': 35600, '2016': 37600, '2017': 42600,
-                    '2018': 46800, '2019': 53700, '2020': 44700, '2021': 64200,
-                    '2022': 79200, '2023': 86200, '2024': 92000, '2025': 98000
-                },
-                'TotalEnergies': {
-                    '2002': 102000, '2003': 118000, '2004': 130000, '2005': 153000,
-                    '2006': 154000, '2007': 158000, '2008': 180000, '2009': 132000,
-                    '2010': 159000, '2011': 184000, '2012': 189000, '2013': 189000,
-                    '2014': 177000, '2015': 143000, '2016': 127000, '2017': 139000,
-                    '2018': 155000, '2019': 176000, '2020': 120000, '2021': 165000,
-                    '2022': 228000, '2023': 200000, '2024': 190000, '2025': 205000
-                },
-                # Ajouter des données pour les autres entreprises...
-            }
-            
-            if company not in revenue_history:
-                # Modèle basé sur la capitalisation boursière
-                market_cap = self.companies[company]['market_cap']
-                sector = self.companies[company]['sector']
-                
-                # Ratio chiffre d'affaires/capitalisation par secteur
-                if sector == 'Banque':
-                    ratio = 0.1  # Les banques ont généralement un ratio plus faible
-                elif sector == 'Énergie':
-                    ratio = 0.8  # Les entreprises énergétiques ont un chiffre d'affaires élevé
-                elif sector == 'Luxe':
-                    ratio = 0.4  # Secteur du luxe
-                else:
-                    ratio = 0.5  # Ratio moyen
-                
-                base_revenue = market_cap * ratio
-                
-                # Créer des données simulées
-                revenue_history[company] = {}
-                for year in range(2002, 2026):
-                    year_str = str(year)
-                    # Croissance annuelle avec variations aléatoires
-                    growth = np.random.normal(0.06, 0.04)  # Croissance moyenne de 6%
-                    # Impact des crises économiques
-                    if year == 2008 or year == 2009:  # Crise financière
-                        growth -= 0.12
-                    if year == 2020:  # COVID-19
-                        growth -= 0.08
-                    
-                    revenue_value = base_revenue * (1 + growth) ** (year - 2002)
-                    revenue_history[company][year_str] = max(100, revenue_value + np.random.normal(0, revenue_value * 0.1))
+            # Référence (magasin chargé une seule fois) puis tableaux publiés, les années manquantes
+            # étant complétées par le modèle basé sur la capitalisation boursière
+            revenue_history = self._known_or_simulated('revenue', company, years,
+                                                       self._create_simulated_revenue_data)
             
-            return revenue_history[company]
+            return revenue_history
             
         except Exception as e:
             print(f"❌ Erreur données chiffre d'affaires pour {company}: {e}")
-            return self._create_simulated_revenue_data(company)
+            return self._create_simulated_revenue_data(company, years)
     
-    def get_company_profit(self, company):
+    @profiled
+    @cached_series('profit')
+    def get_company_profit(self, company, years=None):
         """
         Récupère les données de bénéfice pour une entreprise donnée
         """
         try:
-            # Données historiques approximatives de bénéfice net (en millions d'euros)
-            profit_history = {
-                'LVMH': {
-                    '2002': 800, '2003': 900, '2004': 1100, '2005': 1300,
-                    '2006': 1500, '2007': 1700, '2008': 1600, '2009': 1500,
-                    '2010': 2300, '2011': 2700, '2012': 3400, '2013': 3400,
-                    '2014': 3600, '2015': 3600, '2016': 4000, '2017': 5100,
-                    '2018': 6400, '2019': 7200, '2020': 4700, '2021': 12000,
-                    '2022': 14100, '2023': 15200, '2024': 16500, '2025': 17800
-                },
-                'TotalEnergies': {
-                    '2002': 7000, '2003': 8500, '2004': 10000, '2005': 12000,
-                    '2006': 13000, '2007': 14000, '2008': 11000, '2009': 8000,
-                    '2010': 11000, '2011': 13000, '2012': 12000, '2013': 11000,
-                    '2014': 4000, '2015': 5000, '2016': 6000, '2017': 8500,
-                    '2018': 11500, '2019': 11200, '2020': 4000, '2021': 16000,
-                    '2022': 21000, '2023': 21000, '2024': 20000, '2025': 22000
-                },
-                # Ajouter des données pour les autres entreprises...
-            }
+            # Référence (magasin chargé une seule fois) puis tableaux publiés, les années manquantes
+            # étant complétées par le modèle basé sur le chiffre d'affaires et la marge sectorielle
+            profit_history = self._known_or_simulated('profit', company, years,
+                                                      self._create_simulated_profit_data)
             
-            if company not in profit_history:
-                # Modèle basé sur le chiffre d'affaires et la marge sectorielle
-                revenue_data = self.get_company_revenue(company)
-                sector = self.companies[company]['sector']
-                
-                # Marges sectorielles typiques
-                if sector == 'Banque':
-                    margin = 0.15  # Marge bancaire
-                elif sector == 'Luxe':
-                    margin = 0.20  # Forte marge dans le luxe
-                elif sector == 'Énergie':
-                    margin = 0.08  # Marge faible dans l'énergie
-                elif sector == 'Pharmaceutique':
-                    margin = 0.18  # Bonne marge pharmaceutique
-                else:
-                    margin = 0.10  # Marge moyenne
-                
-                # Créer des données simulées
-                profit_history[company] = {}
-                for year in range(2002, 2026):
-                    year_str = str(year)
-                    revenue = revenue_data[year_str]
-                    # Variation aléatoire de la marge
-                    margin_variation = np.random.normal(0, 0.03)
-                    profit = revenue * (margin + margin_variation)
-                    profit_history[company][year_str] = profit
-            
-            return profit_history[company]
+            return profit_history
             
         except Exception as e:
             print(f"❌ Erreur données bénéfice pour {company}: {e}")
-            return self._create_simulated_profit_data(company)
+            return self._create_simulated_profit_data(company, years)
+    
+    @profiled
+    @cached_series('tax_rate')
+    def get_company_effective_tax_rate(self, company, years=None):
+        """
+        Récupère le taux effectif d'imposition pour une entreprise donnée
+        """
+        try:
+            # Référence (magasin chargé une seule fois) puis tableaux publiés, les années manquantes
+            # étant complétées par le modèle basé sur le pays et le secteur
+            tax_rate_history = self._known_or_simulated('tax_rate', company, years,
+                                                        self._create_simulated_tax_rate_data)
+            
+            return tax_rate_history
+            
+        except Exception as e:
+            print(f"❌ Erreur données taux d'imposition pour {company}: {e}")
+            return self._create_simulated_tax_rate_data(company, years)
+    
+    @property
+    def companies(self):
+        """Registre des entreprises suivies (CompanyRegistry)"""
+        return self._companies
+    
+    @companies.setter
+    def companies(self, companies):
+        # Un dictionnaire {nom: {'sector', 'country', 'market_cap'}} est converti en registre
+        self._companies = companies if isinstance(companies, CompanyRegistry) else CompanyRegistry.from_mapping(companies)
+    
+    def simulation_bases(self, companies):
+        """Bases de simulation (TVA, CA, marge, taux de base) d'entreprises, par recherches vectorisées"""
+        positions = self.companies.positions(companies)
+        return self.parameters.simulation_bases(self.companies.sector[positions], self.companies.country[positions],
+                                                self.companies.market_cap[positions])
+    
+    def _company_bases(self, company):
+        """Bases de simulation d'une entreprise, calculées en un seul lot pour tout l'univers à la première demande"""
+        bases = self._bases.get(company) if self._bases_source is self.companies else None
+        if bases is None:
+            companies = list(self.companies)
+            self._bases = dict(zip(companies, zip(*self.simulation_bases(companies))))
+            self._bases_source = self.companies
+            bases = self._bases[company]
+        return bases
+    
+    def _company_rng(self, company, metric):
+        """
+        Générateur propre à une entreprise et à un indicateur, dérivé de la graine de l'analyseur
+        et du nom de l'entreprise (indépendant de sa position dans l'univers)
+        """
+        name_key = int.from_bytes(hashlib.sha256(company.encode('utf-8')).digest()[:8], 'little')
+        metric_key = ReferenceStore.METRICS.index(metric)
+        return np.random.default_rng(np.random.SeedSequence(self.seed_sequence.entropy,
+                                                            spawn_key=(name_key, metric_key)))
+    
+    def _to_year_dict(self, values, years=None):
+        """Convertit une série annuelle numpy en dictionnaire {année: valeur}"""
+        years = self.years if years is None else years
+        return {str(year): float(value) for year, value in zip(years, values)}
+    
+    def _simulation_start(self, company, field, anchor):
+        """
+        Base de simulation d'une entreprise et année de cette base : bases du modèle par défaut,
+        ou valeur connue `anchor` = (année, valeur) à prolonger
+        """
+        if anchor is None:
+            return np.array([self._company_bases(company)[field]]), None
+        return np.array([anchor[1]], dtype=float), anchor[0]
+    
+    def _create_simulated_vat_data(self, company, years=None, anchor=None):
+        """Crée des données simulées de TVA pour une entreprise"""
+        years = self.years if years is None else np.asarray(years)
+        base_vat, base_year = self._simulation_start(company, 0, anchor)
+        rng = self._company_rng(company, 'vat')
+        return self._to_year_dict(self.engine.simulate_vat(base_vat, years, rng, base_year)[0], years)
+    
+    def _create_simulated_revenue_data(self, company, years=None, anchor=None):
+        """Crée des données simulées de chiffre d'affaires pour une entreprise"""
+        years = self.years if years is None else np.asarray(years)
+        base_revenue, base_year = self._simulation_start(company, 1, anchor)
+        rng = self._company_rng(company, 'revenue')
+        return self._to_year_dict(self.engine.simulate_revenue(base_revenue, years, rng, base_year)[0], years)
+    
+    def _create_simulated_profit_data(self, company, years=None, anchor=None):
+        """
+        Crée des données simulées de bénéfice pour une entreprise (marge sectorielle, ou marge
+        de l'année connue `anchor` lorsqu'une série connue est prolongée)
+        """
+        years = self.years if years is None else np.asarray(years)
+        revenue_data = self.get_company_revenue(company, years)
+        revenue = np.array([[revenue_data[str(year)] for year in years]])
+        if anchor is None:
+            margin = np.array([self._company_bases(company)[2]])
+        else:
+            anchor_revenue = self.get_company_revenue(company, [anchor[0]])[str(anchor[0])]
+            margin = np.array([anchor[1] / anchor_revenue if anchor_revenue else self._company_bases(company)[2]])
+        rng = self._company_rng(company, 'profit')
+        return self._to_year_dict(self.engine.simulate_profit(revenue, margin, rng)[0], years)
+    
+    def _create_simulated_tax_rate_data(self, company, years=None, anchor=None):
+        """Crée des données simulées de taux d'imposition pour une entreprise"""
+        years = self.years if years is None else np.asarray(years)
+        base_rate, base_year = self._simulation_start(company, 3, anchor)
+        rng = self._company_rng(company, 'tax_rate')
+        return self._to_year_dict(self.engine.simulate_tax_rate(base_rate, years, rng, base_year)[0], years)
+    
+    def simulate_universe(self, companies=None, years=None, company_streams=False):
+        """
+        Simule en un seul lot toutes les séries (TVA, CA, bénéfice, taux) d'un univers d'entreprises
+        
+        Retourne un bloc colonnaire (entreprise × année aplati) prêt à être converti en DataFrame.
+        Avec `company_streams`, chaque entreprise tire ses chocs de son propre flux (_company_rng) :
+        les valeurs sont alors celles des getters, quel que soit le lot ; sinon le flux unique du
+        moteur est utilisé (univers synthétiques, bancs d'essai).
+        """
+        companies = list(self.companies) if companies is None else list(companies)
+        years = self.years if years is None else np.asarray(years)
+        base_vat, base_revenue, margin, base_rate = self.simulation_bases(companies)
+        rngs = None
+        if company_streams:
+            rngs = {metric: [self._company_rng(company, metric) for company in companies]
+                    for metric in ReferenceStore.METRICS}
+        
+        block = self.engine.simulate_block(base_vat, base_revenue, margin, base_rate, years, rngs)
+        block['Company'] = np.repeat(np.array(companies, dtype=object), len(years))
+        return block
+    
+    def run_monte_carlo(self, n_paths=10000, seed=None, processes=1, percentiles=(5, 50, 95),
+                        max_chunk_elements=5_000_000):
+        """
+        Mode Monte Carlo : K trajectoires des modèles de croissance, de bruit, de marge et de taux
+        
+        Les trajectoires sont vectorisées et simulées par lots bornés (au plus `max_chunk_elements`
+        valeurs par indicateur), un secteur par tâche sur un pool de processus, avec des flux
+        aléatoires indépendants dérivés de `seed`. Retourne les bandes de centiles par
+        entreprise/année et par secteur/année (totaux sectoriels, taux moyen).
+        """
+        companies = list(self.companies)
+        company_sectors = self.companies.column('sector')
+        sectors = sorted(set(company_sectors))
+        years = self.years
+        chunk_size = max(1, max_chunk_elements // (n_paths * len(years)))
+        
+        tasks = []
+        members = []
+        for sector, sector_sequence in zip(sectors, np.random.SeedSequence(seed).spawn(len(sectors))):
+            sector_companies = [company for company, company_sector in zip(companies, company_sectors)
+                                if company_sector == sector]
+            bases = self.simulation_bases(sector_companies)
+            tasks.append((sector_sequence, bases, years, self.engine.base_year, n_paths,
+                          list(percentiles), chunk_size))
+            members.append(sector_companies)
+        
+        if processes is not None and processes <= 1:
+            results = list(map(_monte_carlo_sector, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(_monte_carlo_sector, tasks))
+        
+        metrics = self.SERIES_COLUMNS
+        columns = [f'P{q:g}' for q in percentiles]
+        
+        def to_frame(level, names, bands):
+            # bands : (noms, années, indicateurs, centiles) -> format long
+            index = pd.MultiIndex.from_product([names, years, metrics], names=[level, 'Year', 'Metric'])
+            return pd.DataFrame(bands.reshape(-1, len(percentiles)), index=index, columns=columns).reset_index()
+        
+        company_bands = pd.concat([to_frame('Company', names, bands) for names, (bands, _) in zip(members, results)])
+        company_bands['Company'] = pd.Categorical(company_bands['Company'], categories=companies)
+        company_bands = company_bands.sort_values(['Company', 'Year'], kind='stable').reset_index(drop=True)
+        sector_bands = pd.concat([to_frame('Sector', [sector], bands[None])
+                                  for sector, (_, bands) in zip(sectors, results)], ignore_index=True)
+        return {'companies': company_bands, 'sectors': sector_bands}
+    
+    @profiled
+    def get_all_companies_data(self, companies=None, years=None):
+        """
+        Récupère toutes les données pour toutes les entreprises
+        (ou pour un sous-ensemble d'entreprises et d'années)
+        """
+        print("🚀 Début de la récupération des données TVA des entreprises Euronext...\n")
+        
+        companies = list(self.companies) if companies is None else list(companies)
+        years = self.years if years is None else np.asarray(years)
+        
+        return self._assemble_frame(companies, years, self._collect_columns(companies, years))
+    
+    def _collect_columns(self, companies, years, verbose=True):
+        """Colonnes des séries (entreprise × année) remplies par les getters, entreprise par entreprise"""
+        n_years = len(years)
+        
+        # Colonnes numériques préallouées (entreprise × année)
+        columns = {name: np.empty(len(companies) * n_years) for name in self.SERIES_COLUMNS}
+        
+        # Récupérer toutes les données, entreprise par entreprise dans l'ordre
+        for i, (company, series) in enumerate(zip(companies, self.collect_company_series(companies, years))):
+            if verbose:
+                print(f"📊 Traitement des données pour {company}...")
+            
+            rows = slice(i * n_years, (i + 1) * n_years)
+            for name, history in series.items():
+                columns[name][rows] = [history[str(year)] for year in years]
+        return columns
     
-    def get_company_effective_tax_rate(self, company):
+    def iter_companies_data(self, chunk_size=1000, companies=None, years=None):
         """
-        Récupère le taux effectif d'imposition pour une entreprise donnée
+        Générateur du jeu de données par blocs de `chunk_size` entreprises (toutes années)
+        
+        Chaque bloc est un DataFrame complet (colonnes dérivées comprises) ; la mémoire des séries
+        de l'exécution est libérée après chaque bloc, si bien que l'empreinte reste bornée par la
+        taille d'un bloc quelle que soit la taille de l'univers. Seules les entreprises ayant des
+        données de référence ou une source publiée passent par les getters : les autres sont
+        simulées en un seul lot par bloc, chacune avec son propre flux aléatoire, si bien que le
+        résultat ne dépend pas de `chunk_size` et reste celui de get_all_companies_data.
+        """
+        companies = list(self.companies) if companies is None else list(companies)
+        years = self.years if years is None else np.asarray(years)
+        
+        for start in range(0, len(companies), chunk_size):
+            chunk = companies[start:start + chunk_size]
+            observed = np.array([self._has_observed_data(company) for company in chunk], dtype=bool)
+            rows = np.repeat(observed, len(years))
+            columns = {name: np.empty(len(rows)) for name in self.SERIES_COLUMNS}
+            if observed.any():
+                known = self._collect_columns([company for company, o in zip(chunk, observed) if o], years,
+                                              verbose=False)
+                for name in self.SERIES_COLUMNS:
+                    columns[name][rows] = known[name]
+            if not observed.all():
+                block = self.simulate_universe([company for company, o in zip(chunk, observed) if not o], years,
+                                               company_streams=True)
+                for name in self.SERIES_COLUMNS:
+                    columns[name][~rows] = block[name]
+            with self._series_lock:
+                self._series.clear()
+                self._series_locks.clear()
+            yield self._assemble_frame(chunk, years, columns)
+    
+    def _has_observed_data(self, company):
+        """Vrai si l'entreprise a des séries de référence ou une source de tableaux publiés"""
+        return company in self.reference.index or company in self.sources.sources
+    
+    @profiled
+    def get_all_companies_data_parallel(self, processes=None, shard_size=None):
+        """
+        Exécute le pipeline entreprise par entreprise sur un pool de processus
+        
+        Chaque processus traite des lots d'entreprises et écrit ses séries dans un tampon
+        colonnaire en mémoire partagée ; chaque entreprise dispose de son propre flux aléatoire
+        dérivé de la graine de l'analyseur, si bien que le résultat est identique quel que soit
+        le nombre de processus. Les indicateurs dérivés sont calculés ensuite, en vectoriel.
         """
+        print("🚀 Début de la récupération parallèle des données TVA des entreprises Euronext...\n")
+        
+        companies = list(self.companies)
+        years = self.years
+        n_rows = len(companies) * len(years)
+        processes = processes or os.cpu_count() or 1
+        shard_size = shard_size or max(1, -(-len(companies) // (processes * 4)))
+        
+        shape = (len(self.SERIES_COLUMNS), n_rows)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
         try:
-            # Données historiques approximatives de taux effectif d'imposition (%)
-            tax_rate_history = {
-                'LVMH': {
-                    '2002': 28.0, '2003': 28.5, '2004': 29.0, '2005': 29.5,
-                    '2006': 30.0, '2007': 30.5, '2008': 31.0, '2009': 31.5,
-                    '2010': 32.0, '2011': 32.5, '2012': 33.0, '2013': 33.5,
-                    '2014': 34.0, '2015': 34.5, '2016': 35.0, '2017': 35.5,
-                    '2018': 36.0, '2019': 36.5, '2020': 37.0, '2021': 37.5,
-                    '2022': 38.0, '2023': 38.5, '2024': 39.0, '2025': 39.5
-                },
-                'TotalEnergies': {
-                    '2002': 35.0, '2003': 35.5, '2004': 36.0, '2005': 36.5,
-                    '2006': 37.0, '2007': 37.5, '2008': 38.0, '2009': 38.5,
-                    '2010': 39.0, '2011': 39.5, '2012': 40.0, '2013': 40.5,
-                    '2014': 41.0, '2015': 41.5, '2016': 42.0, '2017': 42.5,
-                    '2018': 43.0, '2019': 43.5, '2020': 44.0, '2021': 44.5,
-                    '2022': 45.0, '2023': 45.5, '2024': 46.0, '2025': 46.5
-                },
-                # Ajouter des données pour les autres entreprises...
-            }
-            
-            if company not in tax_rate_history:
-                # Modèle basé sur le pays et le secteur
-                country = self.companies[company]['country']
-                sector = self.companies[company]['sector']
-                
-                # Taux de base par pays
-                if country == 'France':
-                    base_rate = 33.0
-                elif country == 'Pays-Bas':
-                    base_rate = 25.0
-                elif country == 'Suisse':
-                    base_rate = 18.0
-                else:
-                    base_rate = 28.0
-                
-                # Ajustements sectoriels
-                if sector == 'Énergie':
-                    base_rate += 5.0  # Secteur souvent plus taxé
-                elif sector == 'Banque':
-                    base_rate += 3.0  # Secteur bancaire plus taxé
-                
-                # Créer des données simulées
-                tax_rate_history[company] = {}
-                for year in range(2002, 2026):
-                    year_str = str(year)
-                    # Tendance à la hausse progressive
-                    trend = (year - 2002) * 0.2
-                    variation = np.random.normal(0, 1.0)
-                    tax_rate = base_rate + trend + variation
-                    tax_rate_history[company][year_str] = max(15.0, min(50.0, tax_rate))
+            buffer = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            # Même entropie que l'analyseur : les flux par entreprise sont ceux de la collecte séquentielle
+            settings = {'seed': self.seed_sequence.entropy, 'start_year': self.start_year,
+                        'end_year': self.end_year, 'reference': self.reference, 'sources': self.sources,
+                        'parameters': self.parameters}
+            tasks = [(start, min(shard_size, len(companies) - start))
+                     for start in range(0, len(companies), shard_size)]
             
-            return tax_rate_history[company]
-            
-        except Exception as e:
-            print(f"❌ Erreur données taux d'imposition pour {company}: {e}")
-            return self._create_simulated_tax_rate_data(company)
-    
-    def _create_simulated_vat_data(self, company):
-        """Crée des données simulées de TVA pour une entreprise"""
-        sector = self.companies[company]['sector']
-        market_cap = self.companies[company]['market_cap']
-        country = self.companies[company]['country']
-        
-        # Base de TVA selon le secteur
-        if sector == 'Énergie':
-            base_vat = market_cap * 0.0015
-        elif sector == 'Luxe':
-            base_vat = market_cap * 0.0008
-        elif sector == 'Banque':
-            base_vat = market_cap * 0.0003
-        elif sector == 'Pharmaceutique':
-            base_vat = market_cap * 0.0006
-        elif sector == 'Aéronautique':
-            base_vat = market_cap * 0.0007
-        else:
-            base_vat = market_cap * 0.0005
-        
-        vat_data = {}
-        for year in range(2002, 2026):
-            year_str = str(year)
-            # Croissance annuelle avec variations aléatoires
-            growth = np.random.normal(0.05, 0.03)
-            # Impact des crises économiques
-            if year == 2008 or year == 2009:
-                growth -= 0.15
-            if year == 2020:
-                growth -= 0.10
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_pipeline_worker,
+                                     initargs=(shm.name, shape, settings, self.companies)) as pool:
+                for done in pool.map(_pipeline_shard, tasks):
+                    print(f"📊 {done} entreprises traitées")
             
-            vat_value = base_vat * (1 + growth) ** (year - 2002)
-            vat_data[year_str] = max(10, vat_value + np.random.normal(0, vat_value * 0.1))
+            columns = {name: buffer[m].copy() for m, name in enumerate(self.SERIES_COLUMNS)}
+        finally:
+            shm.close()
+            shm.unlink()
         
-        return vat_data
+        return self._assemble_frame(companies, years, columns)
     
-    def _create_simulated_revenue_data(self, company):
-        """Crée des données simulées de chiffre d'affaires pour une entreprise"""
-        market_cap = self.companies[company]['market_cap']
-        sector = self.companies[company]['sector']
-        
-        # Ratio chiffre d'affaires/capitalisation par secteur
-        if sector == 'Banque':
-            ratio = 0.1
-        elif sector == 'Énergie':
-            ratio = 0.8
-        elif sector == 'Luxe':
-            ratio = 0.4
-        else:
-            ratio = 0.5
-        
-        base_revenue = market_cap * ratio
-        
-        revenue_data = {}
-        for year in range(2002, 2026):
-            year_str = str(year)
-            # Croissance annuelle avec variations aléatoires
-            growth = np.random.normal(0.06, 0.04)
-            # Impact des crises économiques
-            if year == 2008 or year == 2009:
-                growth -= 0.12
-            if year == 2020:
-                growth -= 0.08
-            
-            revenue_value = base_revenue * (1 + growth) ** (year - 2002)
-            revenue_data[year_str] = max(100, revenue_value + np.random.normal(0, revenue_value * 0.1))
-        
-        return revenue_data
-    
-    def _create_simulated_profit_data(self, company):
-        """Crée des données simulées de bénéfice pour une entreprise"""
-        revenue_data = self.get_company_revenue(company)
-        sector = self.companies[company]['sector']
-        
-        # Marges sectorielles typiques
-        if sector == 'Banque':
-            margin = 0.15
-        elif sector == 'Luxe':
-            margin = 0.20
-        elif sector == 'Énergie':
-            margin = 0.08
-        elif sector == 'Pharmaceutique':
-            margin = 0.18
-        else:
-            margin = 0.10
-        
-        profit_data = {}
-        for year in range(2002, 2026):
-            year_str = str(year)
-            revenue = revenue_data[year_str]
-            # Variation aléatoire de la marge
-            margin_variation = np.random.normal(0, 0.03)
-            profit = revenue * (margin + margin_variation)
-            profit_data[year_str] = profit
-        
-        return profit_data
+    @profiled
+    def simulate_companies_data(self, companies=None, years=None):
+        """
+        Construit directement le DataFrame d'un univers entièrement simulé, sans passer
+        par les getters entreprise par entreprise (univers synthétiques, bancs d'essai)
+        """
+        companies = list(self.companies) if companies is None else list(companies)
+        years = self.years if years is None else np.asarray(years)
+        block = self.simulate_universe(companies, years)
+        return self._assemble_frame(companies, years, {name: block[name] for name in self.SERIES_COLUMNS})
     
-    def _create_simulated_tax_rate_data(self, company):
-        """Crée des données simulées de taux d'imposition pour une entreprise"""
-        country = self.companies[company]['country']
-        sector = self.companies[company]['sector']
-        
-        # Taux de base par pays
-        if country == 'France':
-            base_rate = 33.0
-        elif country == 'Pays-Bas':
-            base_rate = 25.0
-        elif country == 'Suisse':
-            base_rate = 18.0
-        else:
-            base_rate = 28.0
+    def _assemble_frame(self, companies, years, columns):
+        """
+        Crée le DataFrame final colonne par colonne à partir des séries (entreprise × année aplaties)
+        et ajoute les colonnes de référence (taux de TVA du pays, capitalisation) et les indicateurs
+        """
+        n_years = len(years)
+        company_codes = np.repeat(np.arange(len(companies)), n_years)
         
-        # Ajustements sectoriels
-        if sector == 'Énergie':
-            base_rate += 5.0
-        elif sector == 'Banque':
-            base_rate += 3.0
+        # Taux de TVA en vigueur en fin d'année, résolus pour toutes les lignes en une opération
+        positions = self.companies.positions(companies)
+        countries = np.asarray(self.companies.country)[positions]
+        vat_rates = self.vat_schedule.annual_rates(countries, years)
+        market_caps = self.companies.market_cap[positions]
+        currencies = np.asarray(self.companies.currency)[positions]
         
-        tax_rate_data = {}
-        for year in range(2002, 2026):
-            year_str = str(year)
-            # Tendance à la hausse progressive
-            trend = (year - 2002) * 0.2
-            variation = np.random.normal(0, 1.0)
-            tax_rate = base_rate + trend + variation
-            tax_rate_data[year_str] = max(15.0, min(50.0, tax_rate))
+        sectors = np.asarray(self.companies.sector)[positions]
+        df = pd.DataFrame({
+            'Company': pd.Categorical.from_codes(company_codes, categories=companies),
+            'Sector': self._categorical_column(sectors, company_codes),
+            'Country': self._categorical_column(countries, company_codes),
+            'Year': np.tile(years, len(companies)).astype(np.int16),
+            **columns,
+            'Country VAT Rate (%)': vat_rates,
+            'Market Cap (M€)': np.repeat(market_caps, n_years),
+            'Currency': self._categorical_column(currencies, company_codes),
+        })
         
-        return tax_rate_data
+        with self.profiler.stage('fx_normalization'):
+            df = self._normalize_currency(df)
+        with self.profiler.stage('derived_columns'):
+            return self._add_derived_columns(df)
     
-    def get_all_companies_data(self):
+    def update_dataset(self, existing):
         """
-        Récupère toutes les données pour toutes les entreprises
+        Mode incrémental : complète un jeu de données existant avec les cellules
+        (entreprise, année) manquantes, sans recalculer les lignes déjà présentes
         """
-        print("🚀 Début de la récupération des données TVA des entreprises Euronext...\n")
-        
-        all_data = []
+        existing = self._restore_dtypes(existing)
+        if 'Currency' not in existing:
+            # Jeu de données antérieur à la conversion des devises : montants déjà exprimés en euros
+            existing['Currency'] = pd.Categorical([self.fx_rates.base] * len(existing))
+            existing = self._normalize_currency(existing)
+        present = set(zip(existing['Company'].astype(str), existing['Year'].astype(int)))
         
+        # Regrouper les entreprises par ensemble d'années manquantes
+        missing = {}
         for company in self.companies:
-            print(f"📊 Traitement des données pour {company}...")
-            
-            # Récupérer toutes les données pour cette entreprise
-            vat_paid = self.get_company_vat_data(company)
-            revenue = self.get_company_revenue(company)
-            profit = self.get_company_profit(company)
-            tax_rate = self.get_company_effective_tax_rate(company)
-            
-            # Créer un DataFrame pour cette entreprise
-            for year in range(2002, 2026):
-                year_str = str(year)
-                country = self.companies[company]['country']
-                vat_rate = self.vat_rates.get(country, {}).get(year_str, 20.0)  # Taux par défaut de 20%
-                
-                company_data = {
-                    'Company': company,
-                    'Sector': self.companies[company]['sector'],
-                    'Country': country,
-                    'Year': year,
-                    'VAT Paid (M€)': vat_paid[year_str],
-                    'Revenue (M€)': revenue[year_str],
-                    'Profit (M€)': profit[year_str],
-                    'Effective Tax Rate (%)': tax_rate[year_str],
-                    'Country VAT Rate (%)': vat_rate,
-                    'Market Cap (M€)': self.companies[company]['market_cap']
-                }
-                all_data.append(company_data)
-            
-            time.sleep(0.1)  # Pause pour éviter de surcharger
+            company_years = tuple(int(year) for year in self.years if (company, int(year)) not in present)
+            if company_years:
+                missing.setdefault(company_years, []).append(company)
         
-        # Créer le DataFrame final
-        df = pd.DataFrame(all_data)
+        if not missing:
+            print("✅ Jeu de données déjà à jour")
+            return existing
         
-        # Ajouter des indicateurs calculés
+        # Seules les nouvelles lignes sont calculées (indicateurs dérivés compris)
+        new_frames = [self.get_all_companies_data(companies, years) for years, companies in missing.items()]
+        n_new = sum(len(frame) for frame in new_frames)
+        print(f"➕ {n_new} nouvelles lignes (entreprise, année) ajoutées")
+        
+        combined = pd.concat([existing.astype({'Company': str, 'Sector': str, 'Country': str})] +
+                             [frame.astype({'Company': str, 'Sector': str, 'Country': str}) for frame in new_frames],
+                             ignore_index=True)
+        order = list(dict.fromkeys(list(existing['Company'].astype(str)) + list(self.companies)))
+        combined = self._restore_dtypes(combined, companies=order)
+        return combined.sort_values(['Company', 'Year'], kind='stable').reset_index(drop=True)
+    
+    @staticmethod
+    def _restore_dtypes(df, companies=None):
+        """Rétablit les types compacts (catégories, Year en int16) d'un jeu de données relu"""
+        df = df.copy()
+        if companies is None:
+            # Conserver l'ordre des entreprises s'il a été préservé (Parquet), sinon l'ordre d'apparition
+            if isinstance(df['Company'].dtype, pd.CategoricalDtype):
+                companies = [str(company) for company in df['Company'].cat.categories]
+            else:
+                companies = list(dict.fromkeys(df['Company'].astype(str)))
+        df['Company'] = pd.Categorical(df['Company'].astype(str), categories=companies)
+        for column in ['Sector', 'Country', 'Currency']:
+            if column in df:
+                df[column] = df[column].astype(str).astype('category')
+        df['Year'] = df['Year'].astype(np.int16)
+        return df
+    
+    def _normalize_currency(self, df):
+        """
+        Convertit en euros les montants publiés dans la devise de l'entreprise (cours moyen
+        de l'année), en conservant les montants d'origine et le cours appliqué
+        """
+        rates = self.fx_rates.rates(df['Currency'], df['Year'])
+        for column, local_column in self.LOCAL_COLUMNS.items():
+            df[local_column] = df[column]
+            df[column] = df[column] / rates
+        df['Market Cap (M€)'] = df['Market Cap (M€)'] / rates
+        df['FX Rate (per €)'] = rates
+        return df
+    
+    @staticmethod
+    def _categorical_column(values, company_codes):
+        """Colonne catégorielle obtenue en propageant une valeur par entreprise à ses lignes"""
+        categories, codes = np.unique(np.asarray(values, dtype=object), return_inverse=True)
+        return pd.Categorical.from_codes(codes[company_codes], categories=categories)
+    
+    @staticmethod
+    def _add_derived_columns(df):
+        """Ajoute les indicateurs calculés (ratios et charge fiscale)"""
         df['VAT/Revenue Ratio (%)'] = df['VAT Paid (M€)'] / df['Revenue (M€)'] * 100
         df['Profit Margin (%)'] = df['Profit (M€)'] / df['Revenue (M€)'] * 100
         df['Tax Paid (M€)'] = df['Profit (M€)'] * df['Effective Tax Rate (%)'] / 100
         df['Total Tax Burden (M€)'] = df['VAT Paid (M€)'] + df['Tax Paid (M€)']
         df['Total Tax Burden/Revenue (%)'] = df['Total Tax Burden (M€)'] / df['Revenue (M€)'] * 100
-        
         return df
     
-    def create_global_analysis_visualization(self, df):
+    def _pyplot(self):
+        """
+        matplotlib.pyplot, importé au premier graphique seulement (backend Agg en mode sans
+        affichage) : les exécutions sans rapport ne paient pas le coût de son import. Le style
+        seaborn est appliqué une fois par processus, pour toutes les figures quel que soit le
+        processus de rendu ou l'ordre des tâches
+        """
+        if self.headless:
+            import matplotlib
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        global _plot_style_applied
+        if not _plot_style_applied:
+            plt.style.use('seaborn-v0_8')
+            _plot_style_applied = True
+        return plt
+    
+    def _figure_path(self, name):
+        return os.path.join(self.output_dir, f'{name}.{self.figure_format}')
+    
+    def _figure_key(self, name, *inputs):
+        """
+        Empreinte d'un graphique (données tracées et paramètres de rendu), ou None si le cache
+        de rendu est inactif : sans cache, ou avec affichage interactif
+        """
+        if self.render_cache is None or not self.headless:
+            return None
+        return RenderCache.key(self.RENDER_VERSION, name, self.dpi, self.figure_format, *inputs)
+    
+    def _figure_unchanged(self, name, key):
+        """Vrai si le graphique déjà enregistré a été rendu à partir des mêmes entrées"""
+        path = self._figure_path(name)
+        if key is None or not self.render_cache.is_current(path, key):
+            return False
+        print(f"♻️  Graphique inchangé, non redessiné: {path}")
+        return True
+    
+    def _finish_figure(self, fig, name, key=None):
+        """
+        Enregistre une figure au format et à la résolution configurés ; en mode sans affichage
+        la figure est fermée au lieu d'être affichée, pour libérer la mémoire
+        """
+        path = self._figure_path(name)
+        with self.profiler.stage('savefig'):
+            fig.savefig(path, dpi=self.dpi, bbox_inches='tight')
+        if key is not None:
+            self.render_cache.put(path, key)
+        plt = self._pyplot()
+        if self.headless:
+            plt.close(fig)
+        else:
+            plt.show()
+        return path
+    
+    @profiled
+    def render_reports(self, df, companies=None, comparison=None, processes=None, with_global=True):
+        """
+        Rendu par lots, sans affichage : analyse globale, rapport de chaque entreprise et analyse
+        comparative, répartis sur un pool de processus
+        
+        Le cube d'agrégats et les classements sont transmis une fois à chaque processus et chaque
+        tâche ne reçoit que les lignes dont elle a besoin (aucune pour l'analyse globale) ; les textes
+        des rapports sont affichés dans l'ordre des tâches.
+        """
+        companies = list(self.companies) if companies is None else list(companies)
+        settings = {'dpi': self.dpi, 'figure_format': self.figure_format, 'output_dir': self.output_dir,
+                    'render_cache': self.render_cache}
+        measured = isinstance(self.profiler, StageProfiler)
+        cube = self.aggregate_cube(df)
+        boards = self.leaderboards(df)
+        
+        index = self.dataset_index(df)
+        tasks = [('global', None, None)] if with_global else []
+        tasks += [('company', index.company(company), company) for company in companies]
+        if comparison:
+            tasks.append(('comparative', pd.concat([index.company(company) for company in comparison]),
+                          list(comparison)))
+        
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker,
+                                 initargs=(settings, self.companies, cube, boards, measured)) as pool:
+            for output, stages in pool.map(_render_task, tasks):
+                print(output, end='')
+                if measured:
+                    self.profiler.merge(stages)
+    
+    def aggregate_cube(self, df):
+        """Cube d'agrégats du DataFrame, construit une seule fois puis réutilisé par les rapports"""
+        if self.cube is None or self.cube_source is not df:
+            with self.profiler.stage('aggregation'):
+                self.cube = AggregateCube(df)
+            self.cube_source = df
+        return self.cube
+    
+    def leaderboards(self, df):
+        """Classements top-N du DataFrame, construits en une passe puis réutilisés par les rapports"""
+        if self.boards is None or self.boards_source is not df:
+            with self.profiler.stage('leaderboards'):
+                self.boards = Leaderboards()
+                self.boards.update(df)
+            self.boards_source = df
+        return self.boards
+    
+    def dataset_index(self, df):
+        """Vue indexée (entreprise, année) du DataFrame, construite une seule fois puis réutilisée"""
+        if self.index is None or self.index_source is not df:
+            self.index = DatasetIndex(df)
+            self.index_source = df
+        return self.index
+    
+    @profiled
+    def create_global_analysis_visualization(self, df, cube=None, boards=None):
         """Crée des visualisations complètes pour l'analyse de la TVA des entreprises Euronext"""
-        plt.style.use('seaborn-v0_8')
+        cube = cube if cube is not None else self.aggregate_cube(df)
+        boards = boards if boards is not None else self.leaderboards(df)
+        years = cube.table(('Year',), 'VAT Paid (M€)').index
+        first_year, latest_year = years.min(), years.max()
+        period = f"{first_year}-{latest_year}"
+        
+        # Données tracées, extraites du cube et des classements
+        sector_vat = cube.table(('Sector', 'Year'), 'VAT Paid (M€)', 'mean')
+        sector_ratios = cube.box_stats('Sector', 'VAT/Revenue Ratio (%)')
+        top_vat = boards.top('VAT Paid (M€)', latest_year, 10)
+        tax_burden = cube.table(('Country', 'Year'), 'Total Tax Burden/Revenue (%)', 'mean')
+        
+        name = f'euronext_vat_analysis_{first_year}_{latest_year}'
+        key = self._figure_key(name, sector_vat, sector_ratios, top_vat[['Company', 'VAT Paid (M€)']], tax_burden)
+        if not self._figure_unchanged(name, key):
+            self._plot_global_analysis(name, key, period, latest_year, sector_vat, sector_ratios, top_vat, tax_burden)
+        
+        # Statistiques et analyse
+        print(f"\n📈 Statistiques descriptives de la TVA des entreprises Euronext ({period}):")
+        print(cube.describe(['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 
+                             'VAT/Revenue Ratio (%)', 'Total Tax Burden/Revenue (%)']))
+        
+        # Analyse des entreprises avec la charge fiscale la plus élevée
+        high_tax_burden = boards.top('Total Tax Burden/Revenue (%)', latest_year, 10)
+        
+        print(f"\n🔍 Entreprises avec la charge fiscale la plus élevée en {latest_year}:")
+        for _, row in high_tax_burden.iterrows():
+            print(f"   - {row['Company']}: {row['Total Tax Burden/Revenue (%)']:.1f}% "
+                  f"(TVA: {row['VAT/Revenue Ratio (%)']:.1f}%, Impôt: {row['Effective Tax Rate (%)']:.1f}%)")
+    
+    def _plot_global_analysis(self, name, key, period, latest_year, sector_vat, sector_ratios, top_vat, tax_burden):
+        """Trace et enregistre la figure de l'analyse globale"""
+        plt = self._pyplot()
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(18, 14))
         
         # 1. TVA moyenne par secteur au fil du temps
-        sector_vat = df.groupby(['Sector', 'Year'])['VAT Paid (M€)'].mean().reset_index()
-        sectors = sector_vat['Sector'].unique()
-        
-        for sector in sectors:
-            sector_data = sector_vat[sector_vat['Sector'] == sector]
-            ax1.plot(sector_data['Year'], sector_data['VAT Paid (M€)'], 
+        for sector, sector_data in sector_vat.groupby(level='Sector', observed=True):
+            ax1.plot(sector_data.index.get_level_values('Year'), sector_data.values, 
                     label=sector, linewidth=2)
         
-        ax1.set_title('TVA Moyenne par Secteur (2002-2025)', fontsize=12, fontweight='bold')
+        ax1.set_title(f'TVA Moyenne par Secteur ({period})', fontsize=12, fontweight='bold')
         ax1.set_ylabel('TVA Payée (M€)')
         ax1.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
         ax1.grid(True, alpha=0.3)
         
-        # 2. Ratio TVA/Chiffre d'affaires par secteur (boxplot)
-        sector_data = [df[df['Sector'] == sector]['VAT/Revenue Ratio (%)'] 
-                      for sector in df['Sector'].unique()]
-        ax2.boxplot(sector_data, labels=df['Sector'].unique())
+        # 2. Ratio TVA/Chiffre d'affaires par secteur (boxplot à partir des quartiles du cube)
+        ax2.bxp(sector_ratios, showfliers=False)
         ax2.set_title('Ratio TVA/Chiffre d\'affaires par Secteur', fontsize=12, fontweight='bold')
         ax2.set_ylabel('TVA/Chiffre d\'affaires (%)')
         ax2.tick_params(axis='x', rotation=45)
         ax2.grid(True, alpha=0.3)
         
-        # 3. Entreprises avec la TVA la plus élevée (2024)
-        latest_year = df['Year'].max()
-        latest_data = df[df['Year'] == latest_year]
-        top_vat = latest_data.nlargest(10, 'VAT Paid (M€)')
-        
-        bars = ax3.barh(top_vat['Company'], top_vat['VAT Paid (M€)'])
+        # 3. Entreprises avec la TVA la plus élevée (dernière année)
+        bars = ax3.barh(top_vat['Company'].astype(str), top_vat['VAT Paid (M€)'])
         ax3.set_title(f'Top 10 des Entreprises avec la TVA la plus Élevée ({latest_year})', 
                      fontsize=12, fontweight='bold')
         ax3.set_xlabel('TVA Payée (M€)')
@@ -551,11 +2200,8 @@ class EuronextVATAnalysis:
                     f'{width:.0f} M€', ha='left', va='center')
         
         # 4. Charge fiscale totale par pays
-        tax_burden = df.groupby(['Country', 'Year'])['Total Tax Burden/Revenue (%)'].mean().reset_index()
-        
-        for country in tax_burden['Country'].unique():
-            country_data = tax_burden[tax_burden['Country'] == country]
-            ax4.plot(country_data['Year'], country_data['Total Tax Burden/Revenue (%)'], 
+        for country, country_data in tax_burden.groupby(level='Country', observed=True):
+            ax4.plot(country_data.index.get_level_values('Year'), country_data.values, 
                     label=country, linewidth=2)
         
         ax4.set_title('Charge Fiscale Totale par Pays (% du Chiffre d\'affaires)', 
@@ -565,26 +2211,13 @@ class EuronextVATAnalysis:
         ax4.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        plt.savefig('euronext_vat_analysis_2002_2025.png', dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        # Statistiques et analyse
-        print("\n📈 Statistiques descriptives de la TVA des entreprises Euronext (2002-2025):")
-        print(df[['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 
-                 'VAT/Revenue Ratio (%)', 'Total Tax Burden/Revenue (%)']].describe())
+        self._finish_figure(fig, name, key)
         
-        # Analyse des entreprises avec la charge fiscale la plus élevée
-        latest_data = df[df['Year'] == latest_year]
-        high_tax_burden = latest_data.nlargest(10, 'Total Tax Burden/Revenue (%)')
-        
-        print(f"\n🔍 Entreprises avec la charge fiscale la plus élevée en {latest_year}:")
-        for _, row in high_tax_burden.iterrows():
-            print(f"   - {row['Company']}: {row['Total Tax Burden/Revenue (%)']:.1f}% "
-                  f"(TVA: {row['VAT/Revenue Ratio (%)']:.1f}%, Impôt: {row['Effective Tax Rate (%)']:.1f}%)")
     
-    def create_company_specific_report(self, df, company_name):
+    @profiled
+    def create_company_specific_report(self, df, company_name, cube=None, plot=True):
         """Crée un rapport spécifique pour une entreprise"""
-        company_data = df[df['Company'] == company_name]
+        company_data = self.dataset_index(df).company(company_name)
         
         if company_data.empty:
             print(f"❌ Aucune donnée trouvée pour {company_name}")
@@ -593,9 +2226,9 @@ class EuronextVATAnalysis:
         print(f"\n📋 Rapport détaillé sur la TVA: {company_name}")
         print("=" * 60)
         
-        # Informations de base
-        latest_year = company_data['Year'].max()
-        latest = company_data[company_data['Year'] == latest_year].iloc[0]
+        # Informations de base (lignes triées par année : la dernière est la plus récente)
+        latest = company_data.iloc[-1]
+        latest_year = latest['Year']
         
         print(f"Secteur: {latest['Sector']}")
         print(f"Pays: {latest['Country']}")
@@ -605,14 +2238,17 @@ class EuronextVATAnalysis:
         print(f"Bénéfice: {latest['Profit (M€)']:.0f} M€")
         print(f"Taux effectif d'imposition: {latest['Effective Tax Rate (%)']:.1f}%")
         print(f"Taux de TVA du pays: {latest['Country VAT Rate (%)']:.1f}%")
+        reduced_rate = self.vat_schedule.annual_rates([latest['Country']], [latest_year], kind='reduced')[0]
+        if not np.isnan(reduced_rate):
+            print(f"Taux de TVA réduit du pays: {reduced_rate:.1f}%")
         print(f"Ratio TVA/CA: {latest['VAT/Revenue Ratio (%)']:.1f}%")
         print(f"Charge fiscale totale: {latest['Total Tax Burden/Revenue (%)']:.1f}%")
         
         # Comparaison avec la moyenne du secteur
         sector = latest['Sector']
-        sector_data = df[(df['Sector'] == sector) & (df['Year'] == latest_year)]
-        sector_avg_vat_ratio = sector_data['VAT/Revenue Ratio (%)'].mean()
-        sector_avg_tax_burden = sector_data['Total Tax Burden/Revenue (%)'].mean()
+        cube = cube if cube is not None else self.aggregate_cube(df)
+        sector_avg_vat_ratio = cube.value('VAT/Revenue Ratio (%)', Sector=sector, Year=latest_year)
+        sector_avg_tax_burden = cube.value('Total Tax Burden/Revenue (%)', Sector=sector, Year=latest_year)
         
         print(f"\n📊 Comparaison avec la moyenne du secteur ({sector}):")
         print(f"   Ratio TVA/CA: {latest['VAT/Revenue Ratio (%)']:.1f}% vs {sector_avg_vat_ratio:.1f}% (moyenne secteur)")
@@ -623,9 +2259,18 @@ class EuronextVATAnalysis:
         print(f"\n📈 Tendance de la TVA payée:")
         print(f"   Maximum: {vat_trend['VAT Paid (M€)'].max():.0f} M€ ({vat_trend['VAT Paid (M€)'].idxmax()})")
         print(f"   Minimum: {vat_trend['VAT Paid (M€)'].min():.0f} M€ ({vat_trend['VAT Paid (M€)'].idxmin()})")
-        print(f"   Moyenne (2002-2025): {vat_trend['VAT Paid (M€)'].mean():.0f} M€")
+        print(f"   Moyenne ({company_data['Year'].min()}-{latest_year}): {vat_trend['VAT Paid (M€)'].mean():.0f} M€")
+        
+        if not plot:
+            return
+        
+        name = f'{company_name}_vat_analysis_{company_data["Year"].min()}_{latest_year}'
+        key = self._figure_key(name, company_name, company_data[self.COMPANY_PLOT_COLUMNS])
+        if self._figure_unchanged(name, key):
+            return
         
         # Visualisation pour l'entreprise spécifique
+        plt = self._pyplot()
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
         
         # 1. TVA payée et chiffre d'affaires
@@ -672,22 +2317,27 @@ class EuronextVATAnalysis:
         ax4.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        plt.savefig(f'{company_name}_vat_analysis_2002_2025.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        self._finish_figure(fig, name, key)
     
+    @profiled
     def create_comparative_analysis(self, df, company_list):
         """Crée une analyse comparative entre plusieurs entreprises"""
         if not all(company in self.companies for company in company_list):
             print("❌ Une ou plusieurs entreprises ne sont pas dans la liste des entreprises Euronext")
             return
         
+        # Tranches des entreprises sélectionnées (vue indexée, sans parcourir tout le DataFrame)
+        index = self.dataset_index(df)
+        company_rows = {company: index.company(company) for company in company_list}
+        if all(rows.empty for rows in company_rows.values()):
+            print(f"❌ Aucune donnée trouvée pour {', '.join(company_list)}")
+            return
+        
         print(f"\n📊 Analyse comparative: {', '.join(company_list)}")
         print("=" * 70)
         
-        # Filtrer les données pour les entreprises sélectionnées
-        comparative_data = df[df['Company'].isin(company_list)]
-        latest_year = comparative_data['Year'].max()
-        latest_data = comparative_data[comparative_data['Year'] == latest_year]
+        latest_year = max(rows['Year'].iloc[-1] for rows in company_rows.values() if not rows.empty)
+        latest_rows = [index.row(company, latest_year) for company in company_list]
         
         # Tableau comparatif
         print(f"\nIndicateurs fiscaux clés ({latest_year}):")
@@ -695,17 +2345,25 @@ class EuronextVATAnalysis:
         print(f"{'Entreprise':<20} {'TVA (M€)':<10} {'CA (M€)':<12} {'Ratio TVA/CA':<12} {'Impôt (M€)':<10} {'Charge fiscale':<15}")
         print("-" * 100)
         
-        for _, row in latest_data.iterrows():
+        for row in latest_rows:
+            if row is None:
+                continue
             print(f"{row['Company']:<20} {row['VAT Paid (M€)']:<10.0f} {row['Revenue (M€)']:<12.0f} "
                   f"{row['VAT/Revenue Ratio (%)']:<12.1f} {row['Tax Paid (M€)']:<10.0f} "
                   f"{row['Total Tax Burden/Revenue (%)']:<15.1f}")
         
+        indicators = ['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 
+                     'VAT/Revenue Ratio (%)', 'Effective Tax Rate (%)', 'Total Tax Burden/Revenue (%)']
+        key = self._figure_key('comparative_vat_analysis', list(company_list),
+                               *(company_rows[company][['Year'] + indicators] for company in company_list))
+        if self._figure_unchanged('comparative_vat_analysis', key):
+            return
+        
         # Visualisation comparative
+        plt = self._pyplot()
         fig, axes = plt.subplots(2, 3, figsize=(18, 12))
         axes = axes.flatten()
         
-        indicators = ['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 
-                     'VAT/Revenue Ratio (%)', 'Effective Tax Rate (%)', 'Total Tax Burden/Revenue (%)']
         titles = ['TVA Payée (M€)', 'Chiffre d\'affaires (M€)', 'Bénéfice (M€)', 
                  'Ratio TVA/CA (%)', 'Taux Imposition Effectif (%)', 'Charge Fiscale Totale (%)']
         
@@ -714,7 +2372,7 @@ class EuronextVATAnalysis:
         for i, (indicator, title) in enumerate(zip(indicators, titles)):
             ax = axes[i]
             for j, company in enumerate(company_list):
-                company_yearly = comparative_data[comparative_data['Company'] == company]
+                company_yearly = company_rows[company]
                 ax.plot(company_yearly['Year'], company_yearly[indicator], 
                        label=company, color=colors[j], linewidth=2)
             
@@ -725,40 +2383,1118 @@ class EuronextVATAnalysis:
                 ax.legend(loc='upper left', bbox_to_anchor=(1, 1))
         
         plt.tight_layout()
-        plt.savefig('comparative_vat_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        self._finish_figure(fig, 'comparative_vat_analysis', key)
 
-# Fonction principale
-def main():
-    # Initialiser l'analyseur
-    analyzer = EuronextVATAnalysis()
+def _monte_carlo_sector(task):
+    """
+    Simule les K trajectoires des entreprises d'un secteur, par sous-lots de taille bornée,
+    et retourne les centiles par entreprise ainsi que ceux des agrégats du secteur
     
-    # Récupérer toutes les données
-    vat_data = analyzer.get_all_companies_data()
+    Chaque sous-lot dispose de son propre flux aléatoire (SeedSequence dérivée) : le résultat
+    ne dépend que de la graine et de la taille des lots, pas du nombre de processus.
+    """
+    (seed_sequence, bases, years, base_year, n_paths, percentiles, chunk_size) = task
+    base_vat, base_revenue, margin, base_rate = bases
+    n_companies, n_years = len(base_vat), len(years)
+    metrics = ['VAT Paid (M€)', 'Revenue (M€)', 'Profit (M€)', 'Effective Tax Rate (%)']
     
-    # Sauvegarder les données dans un fichier CSV
-    vat_data.to_csv('euronext_vat_data_2002_2025.csv', index=False)
-    print(f"\n💾 Données sauvegardées dans 'euronext_vat_data_2002_2025.csv'")
+    company_bands = np.empty((n_companies, n_years, len(metrics), len(percentiles)))
+    sector_paths = np.zeros((n_paths, n_years, len(metrics)))
     
-    # Créer une analyse globale
-    analyzer.create_global_analysis_visualization(vat_data)
+    starts = range(0, n_companies, chunk_size)
+    for start, chunk_sequence in zip(starts, seed_sequence.spawn(len(starts))):
+        chunk = slice(start, min(start + chunk_size, n_companies))
+        n_chunk = chunk.stop - chunk.start
+        engine = SimulationEngine(seed=chunk_sequence, base_year=base_year)
+        
+        # Trajectoires vectorisées : les K chemins sont empilés comme K copies des entreprises du lot
+        block = engine.simulate_block(np.tile(base_vat[chunk], n_paths), np.tile(base_revenue[chunk], n_paths),
+                                      np.tile(margin[chunk], n_paths), np.tile(base_rate[chunk], n_paths), years)
+        for m, metric in enumerate(metrics):
+            paths = block[metric].reshape(n_paths, n_chunk, n_years)
+            company_bands[chunk, :, m, :] = np.moveaxis(np.percentile(paths, percentiles, axis=0), 0, -1)
+            sector_paths[:, :, m] += paths.sum(axis=1)
+    
+    # Agrégats du secteur : totaux pour les montants, moyenne pour le taux d'imposition
+    sector_paths[:, :, 3] /= n_companies
+    sector_bands = np.moveaxis(np.percentile(sector_paths, percentiles, axis=0), 0, -1)
+    return company_bands, sector_bands
+
+
+# Analyseur et tampon partagé propres à chaque processus du pipeline parallèle
+_pipeline_analyzer = None
+_pipeline_buffer = None
+
+
+def _init_pipeline_worker(buffer_name, shape, settings, companies):
+    """Initialise un processus du pipeline : analyseur local et vue numpy du tampon partagé"""
+    global _pipeline_analyzer, _pipeline_buffer
+    shm = shared_memory.SharedMemory(name=buffer_name)
+    _pipeline_buffer = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    _pipeline_analyzer = EuronextVATAnalysis(throttle=False, **settings)
+    _pipeline_analyzer.companies = companies
+
+
+def _pipeline_shard(task):
+    """
+    Traite un lot contigu d'entreprises et écrit leurs séries directement dans le tampon
+    colonnaire partagé (aucun DataFrame n'est sérialisé)
+    """
+    start, count = task
+    analyzer = _pipeline_analyzer
+    _, columns = _pipeline_buffer
+    companies = list(analyzer.companies)
+    n_years = len(analyzer.years)
+    getters = [analyzer.get_company_vat_data, analyzer.get_company_revenue,
+               analyzer.get_company_profit, analyzer.get_company_effective_tax_rate]
     
-    # Créer des rapports spécifiques pour certaines entreprises
-    companies_for_report = ['LVMH', 'TotalEnergies', 'L\'Oréal', 'Sanofi', 'Airbus']
-    for company in companies_for_report:
-        analyzer.create_company_specific_report(vat_data, company)
+    # Flux aléatoires propres à chaque entreprise : indépendants du découpage et du nombre de processus
+    for i in range(start, start + count):
+        company = companies[i]
+        rows = slice(i * n_years, (i + 1) * n_years)
+        for m, getter in enumerate(getters):
+            history = getter(company)
+            columns[m, rows] = [history[str(year)] for year in analyzer.years]
+    return count
+
+
+# Analyseur et cube propres à chaque processus de rendu (initialisés une fois par processus)
+_render_analyzer = None
+_render_cube = None
+_render_boards = None
+
+
+def _init_render_worker(settings, companies, cube, boards, measured=False):
+    """
+    Initialise un processus de rendu : backend Agg, analyseur sans affichage (instrumenté si
+    `measured`), cube d'agrégats et classements
+    """
+    global _render_analyzer, _render_cube, _render_boards
+    profiler = StageProfiler() if measured else None
+    _render_analyzer = EuronextVATAnalysis(throttle=False, headless=True, profiler=profiler, **settings)
+    _render_analyzer.companies = companies
+    _render_cube = cube
+    _render_boards = boards
+
+
+def _render_task(task):
+    """Exécute une tâche de rendu et retourne le texte du rapport produit et les mesures de ses étapes"""
+    kind, df, target = task
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        if kind == 'global':
+            _render_analyzer.create_global_analysis_visualization(df, _render_cube, _render_boards)
+        elif kind == 'company':
+            _render_analyzer.create_company_specific_report(df, target, _render_cube)
+        else:
+            _render_analyzer.create_comparative_analysis(df, target)
+    stages = getattr(_render_analyzer.profiler, 'stages', {})
+    _render_analyzer.profiler.stages = {}
+    return output.getvalue(), stages
+
+
+def synthetic_universe(template, n_companies):
+    """
+    Univers synthétique de `n_companies` entreprises construit en répliquant le gabarit
+    (secteur, pays, capitalisation) des entreprises de `template`
+    """
+    template = template if isinstance(template, CompanyRegistry) else CompanyRegistry.from_mapping(template)
+    names = [f"{name} #{i // len(template) + 1}" for i, name in zip(range(n_companies), itertools.cycle(template))]
+    return template.take(np.arange(n_companies) % len(template), names)
+
+
+def save_dataset(df, path, fmt='csv'):
+    """
+    Enregistre le jeu de données en CSV, ou en Parquet (pyarrow) partitionné par Year et Sector
+    en conservant les colonnes catégorielles
+    """
+    if fmt == 'parquet':
+        # Company est écrite en chaîne (encodée par dictionnaire dans chaque fichier) : un catégoriel
+        # répéterait la liste complète des entreprises dans chacune des partitions
+        df.astype({'Company': str}).to_parquet(path, engine='pyarrow', partition_cols=['Year', 'Sector'],
+                                               index=False, existing_data_behavior='delete_matching')
+    else:
+        df.to_csv(path, index=False)
+
+
+def load_dataset(path, years=None, sectors=None, companies=None):
+    """
+    Relit un jeu de données CSV ou Parquet avec ses types compacts, trié par entreprise et année
     
-    # Créer une analyse comparative
-    analyzer.create_comparative_analysis(vat_data, ['LVMH', 'TotalEnergies', 'L\'Oréal', 'Sanofi'])
+    En Parquet, les filtres `years` et `sectors` ne lisent que les partitions concernées
+    (le filtre `companies` est appliqué à la lecture, groupe de lignes par groupe de lignes).
+    """
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        filters = []
+        if years is not None:
+            filters.append(('Year', 'in', [int(year) for year in years]))
+        if sectors is not None:
+            filters.append(('Sector', 'in', list(sectors)))
+        if companies is not None:
+            filters.append(('Company', 'in', list(companies)))
+        df = pd.read_parquet(path, engine='pyarrow', filters=filters or None)
+        df = EuronextVATAnalysis._restore_dtypes(df, companies=sorted(df['Company'].astype(str).unique()))
+    else:
+        df = EuronextVATAnalysis._restore_dtypes(pd.read_csv(path))
+        if years is not None:
+            df = df[df['Year'].isin(years)]
+        if sectors is not None:
+            df = df[df['Sector'].isin(sectors)]
+        if companies is not None:
+            df = df[df['Company'].isin(companies)]
     
-    # Afficher un résumé des entreprises avec la TVA la plus élevée
-    latest_year = vat_data['Year'].max()
-    latest_data = vat_data[vat_data['Year'] == latest_year]
+    leading = ['Company', 'Sector', 'Country', 'Year']
+    df = df[leading + [column for column in df.columns if column not in leading]]
+    return df.sort_values(['Company', 'Year'], kind='stable').reset_index(drop=True)
+
+
+def stream_dataset(analyzer, outputs, chunk_size=1000, companies=None, years=None, top_n=10):
+    """
+    Génère et enregistre le jeu de données bloc par bloc, sans jamais le matérialiser en entier
     
-    print(f"\n🏆 Classement des entreprises par TVA payée en {latest_year}:")
-    top_vat = latest_data.nlargest(10, 'VAT Paid (M€)')[['Company', 'VAT Paid (M€)', 'VAT/Revenue Ratio (%)']]
+    `outputs` associe un chemin à chaque format écrit ({'csv': ..., 'parquet': ...}). Chaque bloc
+    est ajouté au fichier CSV et/ou écrit dans de nouveaux fichiers des partitions Year/Sector
+    du Parquet, puis intégré aux statistiques descriptives et aux classements.
+    Retourne (statistiques, classements, nombre de lignes).
+    """
+    stats = None
+    boards = Leaderboards(top_n)
+    
+    path = outputs.get('parquet')
+    if path is not None and os.path.exists(path):
+        # Les blocs ajoutent des fichiers aux partitions : on repart d'un répertoire vide
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    
+    for i, chunk in enumerate(analyzer.iter_companies_data(chunk_size, companies, years)):
+        for fmt, path in outputs.items():
+            if fmt == 'parquet':
+                chunk.astype({'Company': str}).to_parquet(path, engine='pyarrow', partition_cols=['Year', 'Sector'],
+                                                          index=False, basename_template=f'part-{i:05d}-{{i}}.parquet')
+            else:
+                chunk.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+        
+        if stats is None:
+            stats = OnlineStatistics([column for column in chunk.columns
+                                      if pd.api.types.is_float_dtype(chunk[column])])
+        stats.update(chunk)
+        boards.update(chunk)
+        targets = ', '.join(f"'{path}'" for path in outputs.values())
+        print(f"📦 Bloc {i + 1}: {len(chunk)} lignes écrites dans {targets}")
+    
+    return stats, boards, 0 if stats is None else stats.count
+
+
+def _path_size(path):
+    """Taille sur disque d'un fichier ou d'un répertoire (octets)"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def benchmark_storage(sizes=(1000, 10000), directory='benchmark_storage', seed=0):
+    """Compare écriture, lecture et taille disque du CSV et du Parquet partitionné"""
+    os.makedirs(directory, exist_ok=True)
+    results = []
+    for n_companies in sizes:
+        analyzer = EuronextVATAnalysis(seed=seed)
+        analyzer.companies = synthetic_universe(analyzer.companies, n_companies)
+        df = analyzer.simulate_companies_data()
+        
+        for fmt, path in [('csv', os.path.join(directory, f'bench_{n_companies}.csv')),
+                          ('parquet', os.path.join(directory, f'bench_{n_companies}.parquet'))]:
+            start = time.perf_counter()
+            save_dataset(df, path, fmt)
+            write_time = time.perf_counter() - start
+            start = time.perf_counter()
+            load_dataset(path)
+            read_time = time.perf_counter() - start
+            start = time.perf_counter()
+            load_dataset(path, years=[analyzer.end_year])
+            year_read_time = time.perf_counter() - start
+            results.append({'companies': n_companies, 'rows': len(df), 'format': fmt,
+                            'write (s)': write_time, 'read (s)': read_time,
+                            'read 1 year (s)': year_read_time, 'size (MB)': _path_size(path) / 1e6})
+    
+    shutil.rmtree(directory)
+    results = pd.DataFrame(results)
+    print("\n⏱️  Comparaison CSV / Parquet:")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return results
+
+def benchmark_reporting(sizes=(1000, 2500, 5000), seed=0):
+    """
+    Mesure le coût des rapports entreprise (texte, sans graphique) sur tout l'univers :
+    avec la vue indexée le temps par entreprise reste constant, le total croît linéairement
+    """
+    results = []
+    for n_companies in sizes:
+        analyzer = EuronextVATAnalysis(seed=seed)
+        analyzer.companies = synthetic_universe(analyzer.companies, n_companies)
+        df = analyzer.simulate_companies_data()
+        analyzer.aggregate_cube(df)
+        
+        start = time.perf_counter()
+        analyzer.dataset_index(df)
+        index_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for company in analyzer.companies:
+                analyzer.create_company_specific_report(df, company, plot=False)
+        report_time = time.perf_counter() - start
+        
+        # Référence : filtrage par masque booléen (un parcours complet par entreprise)
+        sample = list(analyzer.companies)[:100]
+        start = time.perf_counter()
+        for company in sample:
+            df[df['Company'] == company]
+        mask_time = (time.perf_counter() - start) / len(sample)
+        
+        results.append({'companies': n_companies, 'rows': len(df), 'index (s)': index_time,
+                        'reports (s)': report_time, 'per company (ms)': report_time / n_companies * 1e3,
+                        'mask lookup (ms)': mask_time * 1e3})
+    
+    results = pd.DataFrame(results)
+    print("\n⏱️  Rapports entreprise sur tout l'univers (vue indexée):")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    return results
+
+
+BENCHMARK_BASELINE = os.path.join(DATA_DIR, 'benchmark_baseline.json')
+BENCHMARK_CASES = ('series', 'frame', 'derived', 'aggregation', 'rendering')
+# Dégradation tolérée du minimum calibré, par cas (0.5 = 50 % plus lent que la référence) : au-dessus
+# du bruit observé entre exécutions identiques, plus fort pour les cas de quelques millisecondes
+BENCHMARK_TOLERANCES = {'series': 0.8, 'frame': 0.8, 'derived': 0.9, 'aggregation': 0.6, 'rendering': 0.5}
+BENCHMARK_SUITES = ('pipeline', 'storage', 'reporting', 'startup', 'fetch', 'streaming', 'sources')
+
+
+def benchmark_environment():
+    """Empreinte de l'environnement de mesure (interpréteur, machine, bibliothèques de calcul)"""
+    return {'python': sys.version.split()[0], 'system': platform.system(), 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+def benchmark_calibration(repeat=20):
+    """
+    Durée minimale d'une charge de travail fixe (numpy et Python pur), mesurée dans la même
+    exécution que le banc d'essai : elle ramène les temps à la vitesse courante de la machine
+    """
+    values = np.random.default_rng(0).random(1_000_000)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        np.sort(values)
+        sum(i * i for i in range(300_000))
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _time_case(run, repeat, min_sample=0.2, short_repeat=20):
+    """
+    Durées d'un appel de `run` sur `repeat` mesures. Un cas plus court que `min_sample` est
+    enchaîné dans chaque mesure jusqu'à l'atteindre et mesuré au moins `short_repeat` fois
+    (à la manière de timeit) : retourne les durées par appel et le nombre d'appels par mesure
+    """
+    start = time.perf_counter()
+    run()
+    first = time.perf_counter() - start
+    number = 1
+    if first < min_sample:
+        number = int(np.ceil(min_sample / max(first, 1e-6)))
+        repeat = max(repeat, short_repeat)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number)
+    return timings, number
+
+
+def benchmark_pipeline(sizes=(25, 1000, 10000), spans=(12, 24), cases=BENCHMARK_CASES, repeat=5, seed=0,
+                       baseline=BENCHMARK_BASELINE, tolerance=None, record=False):
+    """
+    Banc d'essai des étapes critiques, pour chaque taille d'univers synthétique et chaque
+    nombre d'années : simulation des séries, construction du DataFrame par les getters,
+    colonnes dérivées, agrégation (cube et classements) et rendu des graphiques
+    
+    Chaque cas est répété `repeat` fois (minimum et médiane retenus) ; les cas courts sont
+    enchaînés et répétés davantage (voir _time_case). Les minima, ramenés à la charge de
+    calibration mesurée au début et à la fin de l'exécution, sont comparés à la référence
+    enregistrée dans `baseline` : retourne False si l'un d'eux la dépasse de plus de la
+    tolérance de son cas (BENCHMARK_TOLERANCES, ou `tolerance` pour tous les cas). Une
+    référence enregistrée dans un autre environnement reste bloquante, l'écart est signalé.
+    Avec `record`, la référence est remplacée par ces mesures.
+    """
+    environment = benchmark_environment()
+    calibration = benchmark_calibration()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for span, n_companies in itertools.product(spans, sizes):
+            analyzer = EuronextVATAnalysis(seed=seed, throttle=False, start_year=2025 - span + 1, end_year=2025,
+                                           headless=True, dpi=100, output_dir=directory)
+            analyzer.companies = synthetic_universe(analyzer.companies, n_companies)
+            companies, years = list(analyzer.companies), analyzer.years
+            df = analyzer.simulate_companies_data()
+            base = df[['Company', 'Sector', 'Country', 'Year'] + analyzer.SERIES_COLUMNS +
+                      ['Country VAT Rate (%)', 'Market Cap (M€)']]
+            
+            def frame():
+                # Mémoire des séries vidée : chaque répétition repasse par les getters
+                analyzer._series.clear()
+                analyzer._assemble_frame(companies, years, analyzer._collect_columns(companies, years, verbose=False))
+            
+            def aggregation():
+                AggregateCube(df)
+                Leaderboards().update(df)
+            
+            def rendering():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    analyzer.create_global_analysis_visualization(df)
+                    analyzer.create_company_specific_report(df, companies[0])
+            
+            runs = {'series': analyzer.simulate_universe, 'frame': frame,
+                    'derived': lambda: EuronextVATAnalysis._add_derived_columns(base.copy()),
+                    'aggregation': aggregation, 'rendering': rendering}
+            for case in cases:
+                timings, number = _time_case(runs[case], repeat)
+                results.append({'case': case, 'companies': n_companies, 'years': span, 'runs': len(timings),
+                                'loops': number, 'min (s)': min(timings), 'median (s)': float(np.median(timings))})
+    results = pd.DataFrame(results)
+    calibration = min(calibration, benchmark_calibration())
+    
+    regressions, differences = results.iloc[:0], []
+    if record:
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump({'recorded': datetime.now().isoformat(timespec='seconds'), 'environment': environment,
+                       'calibration (s)': calibration, 'results': results.to_dict('records')}, f, indent=2)
+        print(f"💾 Référence enregistrée dans '{baseline}'")
+    elif baseline and os.path.exists(baseline):
+        with open(baseline, encoding='utf-8') as f:
+            recorded = json.load(f)
+        reference = pd.DataFrame(recorded['results']).set_index(['case', 'companies', 'years'])['min (s)']
+        keys = pd.MultiIndex.from_frame(results[['case', 'companies', 'years']])
+        # Référence ramenée à la vitesse courante de la machine
+        scale = calibration / recorded['calibration (s)'] if recorded.get('calibration (s)') else 1.0
+        results['baseline (s)'] = reference.reindex(keys).to_numpy() * scale
+        results['ratio'] = results['min (s)'] / results['baseline (s)']
+        results['limit'] = 1 + (results['case'].map(BENCHMARK_TOLERANCES) if tolerance is None else tolerance)
+        regressions = results[results['ratio'] > results['limit']]
+        differences = [f"{name} {recorded.get('environment', {}).get(name, '?')} → {value}"
+                       for name, value in environment.items() if recorded.get('environment', {}).get(name) != value]
+    
+    print(f"\n⏱️  Banc d'essai du pipeline (calibration {calibration * 1e3:.0f} ms):")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    if differences:
+        print(f"⚠️  Référence enregistrée dans un autre environnement ({', '.join(differences)}) : "
+              f"comparaison ramenée par la calibration seule")
+    if not regressions.empty:
+        cases_list = ', '.join(f"{row.case} ({row.companies} entreprises, {row.years} ans) x{row.ratio:.2f}"
+                               for row in regressions.itertuples())
+        print(f"❌ {len(regressions)} régression(s) au-delà de la tolérance de leur cas: {cases_list}")
+        if differences:
+            print("   Sur cette machine, établir une référence locale avec --record --baseline ma_reference.json")
+    return regressions.empty
+
+
+def benchmark_startup(runs=5, budget_ms=None, lazy_modules=('matplotlib', 'requests', 'bs4')):
+    """
+    Mesure le coût d'import du module avec `python -X importtime`, dans des interpréteurs neufs
+    
+    Les bibliothèques de tracé, HTTP et HTML ne doivent être chargées que par les
+    traitements qui les utilisent : retourne False si l'une d'elles est importée au démarrage
+    ou si la médiane dépasse `budget_ms`.
+    """
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    code = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); import {module}"
+    totals, direct = [], {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                capture_output=True, text=True, check=True)
+        # Lignes « import time: propre | cumulé | nom », le retrait du nom donnant la profondeur
+        imports = []
+        for line in result.stderr.splitlines():
+            fields = line[len('import time:'):].split('|')
+            if len(fields) == 3 and fields[0].strip().isdigit():
+                name = fields[2].rstrip()
+                imports.append((name.strip(), len(name) - len(name.lstrip()), int(fields[1])))
+        
+        # Sous-arbre du module : lignes plus profondes qui précèdent immédiatement la sienne
+        # (les imports du démarrage de l'interpréteur, comme les fichiers .pth, en sont exclus)
+        end = next(i for i, (name, _, _) in enumerate(imports) if name == module)
+        depth = imports[end][1]
+        start = end
+        while start > 0 and imports[start - 1][1] > depth:
+            start -= 1
+        subtree = imports[start:end]
+        totals.append(imports[end][2])
+        for name, d, cumulative in subtree:
+            if d == depth + 2:
+                direct.setdefault(name, []).append(cumulative)
+    
+    direct = sorted(((float(np.median(times)), name) for name, times in direct.items()), reverse=True)
+    eager = sorted({name.split('.')[0] for name, _, _ in subtree if name.split('.')[0] in lazy_modules})
+    startup_ms = float(np.median(totals)) / 1e3
+    
+    print(f"\n⏱️  Import de {module}: {startup_ms:.0f} ms (médiane de {runs} interpréteurs)")
+    for cumulative, name in direct[:8]:
+        print(f"   {name:<30} {cumulative / 1e3:8.1f} ms")
+    ok = True
+    if eager:
+        print(f"❌ Modules chargés dès le démarrage: {', '.join(eager)}")
+        ok = False
+    if budget_ms is not None and startup_ms > budget_ms:
+        print(f"❌ Budget de démarrage dépassé: {startup_ms:.0f} ms > {budget_ms:.0f} ms")
+        ok = False
+    if ok:
+        print("✅ Démarrage sans import superflu")
+    return ok
+
+
+def benchmark_fetch(latencies=(0.05, 0.2, 0.4), pages=4, per_host_limit=2, workers=16, margin=0.5):
+    """
+    Vérifie la collecte concurrente contre des serveurs HTTP locaux à latence injectée
+    
+    Chaque latence correspond à un hôte (un port de 127.0.0.1) servant `pages` pages. En
+    parallèle, le temps total doit suivre la source la plus lente (ses pages passant par lots
+    de `per_host_limit`) et non la somme des latences ; la limite par hôte doit être respectée
+    et les réponses rendues dans l'ordre des URLs. Retourne False sinon.
+    """
+    import http.server
+    
+    class DelayedHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_GET(self):
+            server = self.server
+            with server.lock:
+                server.active += 1
+                server.peak = max(server.peak, server.active)
+            time.sleep(server.latency)
+            with server.lock:
+                server.active -= 1
+            body = self.path.encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    servers = []
+    for latency in latencies:
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DelayedHandler)
+        server.daemon_threads = True
+        server.latency, server.lock, server.active, server.peak = latency, threading.Lock(), 0, 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    
+    urls = [f'http://127.0.0.1:{server.server_address[1]}/page/{i}'
+            for i in range(pages) for server in servers]
+    batches = -(-pages // per_host_limit)
+    slowest = max(latencies) * batches
+    total = sum(latencies) * pages
+    results = []
+    ok = True
+    try:
+        for mode, max_workers in [('séquentiel', 1), ('parallèle', workers)]:
+            analyzer = EuronextVATAnalysis(throttle=False, max_workers=max_workers, per_host_limit=per_host_limit)
+            start = time.perf_counter()
+            responses = analyzer.fetch_pages(urls, timeout=10)
+            wall = time.perf_counter() - start
+            if [response.text for response in responses] != [urlparse(url).path for url in urls]:
+                print(f"❌ Réponses hors de l'ordre des URLs ({mode})")
+                ok = False
+            results.append({'mode': mode, 'workers': max_workers, 'wall (s)': wall,
+                            'slowest host (s)': slowest, 'sum of latencies (s)': total})
+        peak = max(server.peak for server in servers)
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    
+    results = pd.DataFrame(results)
+    print(f"\n⏱️  Collecte concurrente ({len(latencies)} hôtes, {pages} pages par hôte, "
+          f"{per_host_limit} requêtes simultanées par hôte):")
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    wall = results['wall (s)'].iloc[-1]
+    if wall > slowest * (1 + margin):
+        print(f"❌ Le temps parallèle ({wall:.2f} s) ne suit pas l'hôte le plus lent ({slowest:.2f} s)")
+        ok = False
+    if peak > per_host_limit:
+        print(f"❌ Limite par hôte dépassée: {peak} requêtes simultanées > {per_host_limit}")
+        ok = False
+    if ok:
+        print(f"✅ Temps parallèle borné par l'hôte le plus lent (accélération x{results['wall (s)'].iloc[0] / wall:.1f})")
+    return ok
+
+
+def check_sources(failures=2):
+    """
+    Vérifie l'ingestion des tableaux publiés contre un serveur HTTP local de pages types :
+    corps compressé en gzip, ETag puis réponse 304 à la deuxième exécution (copie du cache),
+    `failures` réponses 503 réessayées avant le succès, et formats de nombres français et
+    néerlandais. Retourne False si l'un des contrôles échoue.
+    """
+    import gzip
+    import http.server
+    
+    pages = {
+        '/fr': ('"fr-1"', """<html><head><meta charset="utf-8"></head><body><table>
+            <tr><th>(M€)</th><th>2023</th><th>2024</th></tr>
+            <tr><td>Chiffre d’affaires</td><td>1 234,5</td><td>12 345,6</td></tr>
+            <tr><td>Résultat net</td><td>(1 200)</td><td>0,125</td></tr>
+            <tr><td>Taux effectif d’imposition</td><td>25,8 %</td><td>24,125 %</td></tr>
+            </table></body></html>"""),
+        '/nl': ('"nl-1"', """<html><head><meta charset="utf-8"></head><body><table>
+            <tr><th>(M€)</th><th>2023</th><th>2024</th></tr>
+            <tr><td>Net sales</td><td>12.345</td><td>1.234.567</td></tr>
+            <tr><td>Net income</td><td>1.234,5</td><td>−0,5</td></tr>
+            </table></body></html>"""),
+    }
+    expected = {
+        'Fixture FR': {'revenue': {'2023': 1234.5, '2024': 12345.6}, 'profit': {'2023': -1200.0, '2024': 0.125},
+                       'tax_rate': {'2023': 25.8, '2024': 24.125}},
+        'Fixture NL': {'revenue': {'2023': 12345.0, '2024': 1234567.0}, 'profit': {'2023': 1234.5, '2024': -0.5}},
+    }
+    
+    class FixtureHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def do_GET(self):
+            server = self.server
+            etag, body = pages[self.path]
+            with server.lock:
+                server.requests.append((self.path, self.headers.get('If-None-Match')))
+                failing = self.path == '/nl' and server.failures > 0
+                server.failures -= failing
+            if failing:
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            content = body.encode('utf-8')
+            gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+            if gzipped:
+                content = gzip.compress(content)
+            with server.lock:
+                server.gzipped.append(gzipped)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', etag)
+            if gzipped:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.daemon_threads = True
+    server.lock, server.requests, server.gzipped, server.failures = threading.Lock(), [], [], failures
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    sources = ReportSources('fixture', {'Fixture FR': {'url': f'{base}/fr'}, 'Fixture NL': {'url': f'{base}/nl'}})
+    
+    checks = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SeriesCache(os.path.join(directory, 'fixture_cache.sqlite'))
+            runs = []
+            for _ in range(2):
+                # Deux exécutions successives partageant le cache disque des pages
+                analyzer = EuronextVATAnalysis(throttle=False, cache=cache, sources=sources, backoff_factor=0)
+                runs.append({company: {metric: analyzer.published_series(metric, company, [2023, 2024])
+                                       for metric in metrics}
+                             for company, metrics in expected.items()})
+            cache.close()
+        first = server.requests[:failures + 2]
+        second = server.requests[failures + 2:]
+        checks.append(("formats FR et NL", runs[0] == expected))
+        checks.append(("corps gzip", len(server.gzipped) == 2 and all(server.gzipped)))
+        checks.append((f"{failures} réponses 503 réessayées",
+                       sum(path == '/nl' for path, _ in first) == failures + 1))
+        checks.append(("ETag puis 304 (copie du cache)",
+                       sorted(second) == [('/fr', pages['/fr'][0]), ('/nl', pages['/nl'][0])] and runs[1] == expected))
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    print("\n🌐 Ingestion des tableaux publiés (serveur local de pages types):")
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    return all(passed for _, passed in checks)
+
+
+def check_streaming(n_synthetic=40, chunk_sizes=(5, 10), seed=0, start_year=2000, end_year=2026):
+    """
+    Vérifie que le mode --stream reproduit exactement get_all_companies_data pour une même graine,
+    quelle que soit la taille des blocs : univers mêlant les entreprises du registre (données de
+    référence, années hors référence complétées par le modèle) et des entreprises synthétiques
+    entièrement simulées. Retourne False si une colonne diffère.
+    """
+    def create():
+        analyzer = EuronextVATAnalysis(seed=seed, throttle=False, start_year=start_year, end_year=end_year)
+        registry = analyzer.companies
+        analyzer.companies = CompanyRegistry.from_frame(pd.concat(
+            [registry.to_frame(), synthetic_universe(registry, n_synthetic).to_frame()], ignore_index=True))
+        return analyzer
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = create().get_all_companies_data()
+    columns = [column for column in expected.columns if pd.api.types.is_float_dtype(expected[column])]
+    
+    ok = True
+    print(f"\n🔁 Mode --stream comparé à la collecte complète ({len(expected)} lignes, graine {seed}):")
+    for chunk_size in chunk_sizes:
+        streamed = pd.concat(list(create().iter_companies_data(chunk_size)), ignore_index=True)
+        different = [column for column in columns
+                     if not np.array_equal(streamed[column].to_numpy(), expected[column].to_numpy(), equal_nan=True)]
+        if len(streamed) != len(expected) or different:
+            print(f"❌ Blocs de {chunk_size}: colonnes différentes {', '.join(different) or '(nombre de lignes)'}")
+            ok = False
+        else:
+            print(f"✅ Blocs de {chunk_size}: identique")
+    return ok
+
+
+def print_vat_ranking(boards, year, n=10):
+    """Affiche le classement des entreprises par TVA payée pour une année"""
+    print(f"\n🏆 Classement des entreprises par TVA payée en {year}:")
+    top_vat = boards.top('VAT Paid (M€)', year, n)
     for i, (_, row) in enumerate(top_vat.iterrows(), 1):
         print(f"{i}. {row['Company']}: {row['VAT Paid (M€)']:.0f} M€ (Ratio: {row['VAT/Revenue Ratio (%)']:.1f}%)")
 
+
+# Interface en ligne de commande
+DEFAULT_REPORT_COMPANIES = ['LVMH', 'TotalEnergies', 'L\'Oréal', 'Sanofi', 'Airbus']
+DEFAULT_COMPARISON = ['LVMH', 'TotalEnergies', 'L\'Oréal', 'Sanofi']
+COMMANDS = ('run', 'collect', 'export', 'report', 'compare', 'bench')
+
+
+def dataset_path(output_dir, start_year, end_year, fmt):
+    """Chemin du jeu de données enregistré pour une plage d'années et un format"""
+    return os.path.join(output_dir, f'euronext_vat_data_{start_year}_{end_year}.{fmt}')
+
+
+def _find_dataset(args):
+    """Jeu de données désigné par --dataset, sinon celui de la plage d'années (Parquet de préférence)"""
+    if args.dataset:
+        return args.dataset
+    for fmt in ('parquet', 'csv'):
+        path = dataset_path(args.output_dir, args.start_year, args.end_year, fmt)
+        if os.path.exists(path):
+            return path
+    sys.exit(f"❌ Aucun jeu de données pour {args.start_year}-{args.end_year} dans '{args.output_dir}' "
+             f"(lancer d'abord la commande collect)")
+
+
+def _formats(fmt):
+    return ['csv', 'parquet'] if fmt == 'both' else [fmt]
+
+
+def _create_analyzer(args, cache=None):
+    """Analyseur configuré par les options communes (univers, années, rendu)"""
+    sources = ReportSources.load(args.sources) if args.sources else None
+    parameters = ModelParameters.load(args.parameters) if args.parameters else None
+    vat_schedule = VATSchedule.load(args.vat_rates) if args.vat_rates else None
+    registry = CompanyRegistry.load(args.registry) if args.registry else None
+    fx_rates = FXRates.load(args.fx_rates) if args.fx_rates else None
+    render_cache = None if args.no_render_cache else RenderCache(os.path.join(args.output_dir, '.render_cache'))
+    analyzer = EuronextVATAnalysis(seed=args.seed, throttle=not args.no_throttle, max_workers=args.workers,
+                                   cache=cache, sources=sources, parameters=parameters,
+                                   vat_schedule=vat_schedule, registry=registry, fx_rates=fx_rates,
+                                   start_year=args.start_year, end_year=args.end_year,
+                                   headless=args.headless, dpi=args.dpi, figure_format=args.figure_format,
+                                   output_dir=args.output_dir, render_cache=render_cache, profiler=args.profiler)
+    if args.sectors or args.countries:
+        analyzer.companies = analyzer.companies.filter(sectors=args.sectors, countries=args.countries)
+        if not len(analyzer.companies):
+            sys.exit("❌ Aucune entreprise du registre ne correspond aux secteurs et pays demandés")
+    if args.universe_size:
+        analyzer.companies = synthetic_universe(analyzer.companies, args.universe_size)
+    return analyzer
+
+
+def _select_companies(analyzer, companies):
+    """Restreint l'univers de l'analyseur aux entreprises demandées"""
+    unknown = [company for company in companies if company not in analyzer.companies]
+    if unknown:
+        sys.exit(f"❌ Entreprises inconnues: {', '.join(unknown)}")
+    analyzer.companies = analyzer.companies.subset(companies)
+
+
+def _open_cache(args):
+    """Cache des séries (par défaut dans --output-dir), validé et fermé à la fin de l'exécution"""
+    if args.no_cache:
+        return None
+    path = args.cache
+    if path is None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, 'euronext_vat_cache.sqlite')
+    cache = SeriesCache(path, refresh=args.refresh)
+    atexit.register(cache.close)
+    return cache
+
+
+def _save(vat_data, args):
+    for fmt in _formats(args.format):
+        output = dataset_path(args.output_dir, args.start_year, args.end_year, fmt)
+        save_dataset(vat_data, output, fmt)
+        print(f"\n💾 Données sauvegardées dans '{output}'")
+
+
+def command_collect(args):
+    """Collecte les séries (cache compris) et enregistre le jeu de données, sans aucun rapport"""
+    cache = _open_cache(args)
+    analyzer = _create_analyzer(args, cache)
+    if args.companies:
+        _select_companies(analyzer, args.companies)
+    
+    if args.stream:
+        os.makedirs(args.output_dir, exist_ok=True)
+        outputs = {fmt: dataset_path(args.output_dir, args.start_year, args.end_year, fmt)
+                   for fmt in _formats(args.format)}
+        stats, boards, n_rows = stream_dataset(analyzer, outputs, chunk_size=args.chunk_size)
+        for output in outputs.values():
+            print(f"\n💾 {n_rows} lignes sauvegardées dans '{output}'")
+        print("\n📈 Statistiques descriptives:")
+        print(stats.describe().T.to_string(float_format=lambda value: f"{value:.2f}"))
+        print_vat_ranking(boards, args.end_year)
+        return
+    
+    # Récupérer toutes les données (ou seulement les cellules manquantes en mode incrémental)
+    if args.incremental:
+        vat_data = analyzer.update_dataset(load_dataset(args.incremental))
+    elif args.parallel:
+        vat_data = analyzer.get_all_companies_data_parallel(processes=args.processes)
+    else:
+        vat_data = analyzer.get_all_companies_data()
+    _save(vat_data, args)
+    if cache is not None:
+        print(f"🗄️  Cache: {analyzer.cache_hits} succès, {analyzer.cache_misses} échecs")
+
+
+def command_export(args):
+    """Réécrit un jeu de données enregistré (sous-ensemble d'entreprises ou d'années) dans un autre format"""
+    source = _find_dataset(args)
+    years = None
+    if args.from_year or args.to_year:
+        years = range(args.from_year or args.start_year, (args.to_year or args.end_year) + 1)
+    vat_data = load_dataset(source, years=years, companies=args.companies)
+    if vat_data.empty:
+        sys.exit(f"❌ Aucune ligne à exporter depuis '{source}' pour la sélection demandée "
+                 f"(entreprises ou années absentes du jeu de données)")
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    first_year, last_year = int(vat_data['Year'].min()), int(vat_data['Year'].max())
+    stem = f'euronext_vat_export_{first_year}_{last_year}'
+    for fmt in _formats(args.format):
+        output = os.path.join(args.output_dir, f'{stem}.{fmt}')
+        save_dataset(vat_data, output, fmt)
+        print(f"💾 {len(vat_data)} lignes exportées dans '{output}'")
+
+
+def command_report(args):
+    """
+    Rapports à partir d'un jeu de données enregistré : entreprises demandées seulement
+    (avec --company), ou analyse globale et rapports par défaut
+    """
+    analyzer = _create_analyzer(args)
+    path = _find_dataset(args)
+    
+    if args.companies:
+        # Seuls les secteurs des entreprises demandées sont lus (moyennes sectorielles du rapport),
+        # sauf pour l'analyse globale qui porte sur tout le jeu de données
+        known = all(company in analyzer.companies for company in args.companies)
+        sectors = {analyzer.companies[company]['sector'] for company in args.companies} if known else None
+        with_global = args.global_analysis
+        vat_data = load_dataset(path) if with_global else load_dataset(path, sectors=sectors)
+        companies = args.companies
+    else:
+        vat_data = load_dataset(path)
+        companies = list(vat_data['Company'].cat.categories) if args.all_companies else DEFAULT_REPORT_COMPANIES
+        with_global = True
+    
+    if args.headless:
+        # Rendu par lots en parallèle, sans affichage
+        analyzer.render_reports(vat_data, companies, None, processes=args.processes, with_global=with_global)
+    else:
+        if with_global:
+            analyzer.create_global_analysis_visualization(vat_data)
+        for company in companies:
+            analyzer.create_company_specific_report(vat_data, company)
+    
+    if with_global:
+        print_vat_ranking(analyzer.leaderboards(vat_data), int(vat_data['Year'].max()))
+
+
+def command_compare(args):
+    """Analyse comparative d'entreprises, à partir d'un jeu de données enregistré"""
+    analyzer = _create_analyzer(args)
+    companies = args.companies or DEFAULT_COMPARISON
+    vat_data = load_dataset(_find_dataset(args), companies=companies)
+    analyzer.create_comparative_analysis(vat_data, companies)
+
+
+def command_run(args):
+    """Chaîne complète historique : collecte, enregistrement, rapports et classement"""
+    if args.stream:
+        command_collect(args)
+        return
+    
+    # Initialiser l'analyseur
+    cache = _open_cache(args)
+    analyzer = _create_analyzer(args, cache)
+    if args.companies:
+        _select_companies(analyzer, args.companies)
+    
+    if args.monte_carlo:
+        bands = analyzer.run_monte_carlo(args.monte_carlo, seed=args.seed, processes=args.processes)
+        for level, frame in bands.items():
+            output = os.path.join(args.output_dir,
+                                  f'euronext_vat_monte_carlo_{level}_{args.start_year}_{args.end_year}.csv')
+            frame.to_csv(output, index=False)
+            print(f"💾 Bandes de centiles ({level}) sauvegardées dans '{output}'")
+        latest = bands['sectors'].query("Year == @args.end_year and Metric == 'VAT Paid (M€)'")
+        print(f"\n🎲 TVA totale par secteur en {args.end_year} ({args.monte_carlo} trajectoires):")
+        print(latest.drop(columns=['Year', 'Metric']).to_string(index=False, float_format=lambda value: f"{value:.0f}"))
+        return
+    
+    # Récupérer toutes les données (ou seulement les cellules manquantes en mode incrémental)
+    if args.from_dataset:
+        vat_data = load_dataset(args.from_dataset)
+    elif args.incremental:
+        vat_data = analyzer.update_dataset(load_dataset(args.incremental))
+    elif args.parallel:
+        vat_data = analyzer.get_all_companies_data_parallel(processes=args.processes)
+    else:
+        vat_data = analyzer.get_all_companies_data()
+    
+    # Sauvegarder les données en CSV et/ou en Parquet partitionné
+    if not args.from_dataset:
+        _save(vat_data, args)
+    if cache is not None:
+        print(f"🗄️  Cache: {analyzer.cache_hits} succès, {analyzer.cache_misses} échecs")
+    
+    companies_for_report = args.companies or DEFAULT_REPORT_COMPANIES
+    if args.all_companies:
+        companies_for_report = list(analyzer.companies)
+    comparison = [company for company in DEFAULT_COMPARISON if company in analyzer.companies]
+    
+    if args.headless:
+        # Rendu par lots en parallèle, sans affichage
+        analyzer.render_reports(vat_data, companies_for_report, comparison, processes=args.processes)
+    else:
+        # Créer une analyse globale
+        analyzer.create_global_analysis_visualization(vat_data)
+        
+        # Créer des rapports spécifiques pour certaines entreprises
+        for company in companies_for_report:
+            analyzer.create_company_specific_report(vat_data, company)
+        
+        # Créer une analyse comparative
+        if comparison:
+            analyzer.create_comparative_analysis(vat_data, comparison)
+    
+    # Afficher un résumé des entreprises avec la TVA la plus élevée
+    print_vat_ranking(analyzer.leaderboards(vat_data), int(vat_data['Year'].max()))
+
+
+def command_bench(args):
+    """Bancs d'essai et vérifications demandés ; code de sortie non nul si l'un d'eux échoue"""
+    seed = args.seed if args.seed is not None else 0
+    suites = {'pipeline': lambda: benchmark_pipeline(sizes=args.sizes, spans=args.spans, cases=args.cases,
+                                                     repeat=args.repeat, seed=seed, baseline=args.baseline,
+                                                     tolerance=args.tolerance, record=args.record),
+              # Mesures comparatives, sans seuil
+              'storage': lambda: benchmark_storage(seed=seed) is not None,
+              'reporting': lambda: benchmark_reporting(seed=seed) is not None,
+              'startup': lambda: benchmark_startup(budget_ms=args.startup_budget_ms),
+              'fetch': benchmark_fetch,
+              'streaming': lambda: check_streaming(seed=seed),
+              'sources': check_sources}
+    failed = [suite for suite in args.suites if not suites[suite]()]
+    if failed:
+        print(f"❌ Échec: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def build_parser():
+    """Analyseur des arguments : une sous-commande par artefact, `run` pour la chaîne complète"""
+    # Options partagées par toutes les sous-commandes
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-c', '--company', dest='companies', action='append', metavar='NOM',
+                        help="entreprise à traiter (option répétable ; par défaut toutes ou la sélection usuelle)")
+    common.add_argument('--registry', metavar='FICHIER',
+                        help="registre des entreprises en CSV ou Parquet (par défaut data/companies.csv)")
+    common.add_argument('--sector', action='append', dest='sectors', metavar='SECTEUR',
+                        help="restreint le registre à ce secteur (option répétable)")
+    common.add_argument('--country', action='append', dest='countries', metavar='PAYS',
+                        help="restreint le registre à ce pays (option répétable)")
+    common.add_argument('--start-year', type=int, default=2002, help="première année analysée")
+    common.add_argument('--end-year', type=int, default=2025, help="dernière année analysée")
+    common.add_argument('-o', '--output-dir', default='.', help="répertoire des jeux de données et des graphiques")
+    common.add_argument('--seed', type=int, default=None, help="graine aléatoire (résultats reproductibles)")
+    common.add_argument('--workers', type=int, default=1,
+                        help="nombre de travailleurs pour la collecte concurrente des données")
+    common.add_argument('--no-throttle', action='store_true',
+                        help="désactive la limitation du débit des requêtes (traitements hors ligne)")
+    common.add_argument('--universe-size', type=int, default=None, metavar='N',
+                        help="univers synthétique de N entreprises construit à partir des entreprises suivies")
+    common.add_argument('--fx-rates', metavar='JSON',
+                        help="cours de change moyens annuels (par défaut data/fx_rates.json)")
+    common.add_argument('--vat-rates', metavar='JSON',
+                        help="barème des taux de TVA par pays (par défaut data/vat_rates.json)")
+    common.add_argument('--parameters', metavar='JSON',
+                        help="paramètres du modèle par secteur et par pays (par défaut data/parameters.json)")
+    common.add_argument('--sources', metavar='JSON',
+                        help="fichier des pages publiées à ingérer (par défaut data/report_sources.json)")
+    common.add_argument('--run-report', metavar='JSON',
+                        help="mesure les étapes du pipeline et écrit le rapport d'exécution en JSON")
+    common.add_argument('--prometheus-textfile', metavar='CHEMIN',
+                        help="écrit les mesures des étapes au format texte de Prometheus")
+    common.add_argument('--trace-memory', action='store_true',
+                        help="mesure aussi le pic mémoire de chaque étape (tracemalloc, plus lent)")
+    common.add_argument('--profile', choices=['cprofile', 'pyinstrument'], default=None,
+                        help="profile toute l'exécution")
+    common.add_argument('--profile-output', metavar='CHEMIN',
+                        help="fichier du profil (.prof pour cProfile, .html pour pyinstrument)")
+    
+    # Collecte des données
+    collecting = argparse.ArgumentParser(add_help=False)
+    collecting.add_argument('--cache', default=None,
+                            help="fichier SQLite du cache des séries (par défaut dans --output-dir)")
+    collecting.add_argument('--no-cache', action='store_true', help="désactive le cache disque")
+    collecting.add_argument('--refresh', action='store_true',
+                            help="ignore le contenu du cache et récupère à nouveau toutes les données")
+    collecting.add_argument('--incremental', metavar='CSV',
+                            help="jeu de données existant à compléter avec les seules cellules manquantes")
+    collecting.add_argument('--parallel', action='store_true',
+                            help="exécute le pipeline entreprise par entreprise sur un pool de processus (--processes)")
+    collecting.add_argument('--stream', action='store_true',
+                            help="génère et enregistre le jeu de données par blocs, en mémoire bornée (sans rapports)")
+    collecting.add_argument('--chunk-size', type=int, default=1000,
+                            help="nombre d'entreprises par bloc en mode --stream")
+    
+    # Format des jeux de données écrits
+    writing = argparse.ArgumentParser(add_help=False)
+    writing.add_argument('--format', choices=['csv', 'parquet', 'both'], default='both',
+                         help="format du jeu de données enregistré")
+    
+    # Jeu de données enregistré en entrée
+    reading = argparse.ArgumentParser(add_help=False)
+    reading.add_argument('--dataset', metavar='CHEMIN',
+                         help="jeu de données enregistré (par défaut celui de la plage d'années dans --output-dir)")
+    
+    # Rendu des graphiques
+    rendering = argparse.ArgumentParser(add_help=False)
+    rendering.add_argument('--headless', action='store_true',
+                           help="rendu par lots sans affichage (backend Agg, pool de processus)")
+    rendering.add_argument('--processes', type=int, default=None,
+                           help="nombre de processus (pipeline parallèle, rendu sans affichage, Monte Carlo)")
+    rendering.add_argument('--dpi', type=int, default=300, help="résolution des graphiques")
+    rendering.add_argument('--figure-format', choices=['png', 'svg', 'pdf'], default='png',
+                           help="format des graphiques")
+    rendering.add_argument('--no-render-cache', action='store_true',
+                           help="redessine tous les graphiques, même ceux dont les données n'ont pas changé")
+    
+    parser = argparse.ArgumentParser(description="Analyse historique de la TVA des entreprises Euronext")
+    commands = parser.add_subparsers(dest='command', metavar='{' + ','.join(COMMANDS) + '}')
+    
+    run = commands.add_parser('run', parents=[common, collecting, writing, rendering],
+                              help="chaîne complète : collecte, enregistrement et rapports (par défaut)")
+    run.add_argument('--from-dataset', metavar='CHEMIN',
+                     help="génère les rapports à partir d'un jeu de données enregistré (CSV ou Parquet)")
+    run.add_argument('--all-companies', action='store_true', help="génère un rapport pour chaque entreprise de l'univers")
+    run.add_argument('--monte-carlo', type=int, metavar='K', default=None,
+                     help="lance K trajectoires Monte Carlo et enregistre les bandes de centiles")
+    run.set_defaults(handler=command_run)
+    
+    collect = commands.add_parser('collect', parents=[common, collecting, writing, rendering],
+                                  help="collecte les données et enregistre le jeu de données, sans rapport")
+    collect.set_defaults(handler=command_collect)
+    
+    export = commands.add_parser('export', parents=[common, reading, writing],
+                                 help="réécrit un jeu de données enregistré, éventuellement filtré")
+    export.add_argument('--from-year', type=int, default=None, help="première année exportée")
+    export.add_argument('--to-year', type=int, default=None, help="dernière année exportée")
+    export.set_defaults(handler=command_export)
+    
+    report = commands.add_parser('report', parents=[common, reading, rendering],
+                                 help="rapports à partir d'un jeu de données enregistré")
+    report.add_argument('--global', dest='global_analysis', action='store_true',
+                        help="ajoute l'analyse globale aux rapports des entreprises demandées")
+    report.add_argument('--all-companies', action='store_true', help="génère un rapport pour chaque entreprise")
+    report.set_defaults(handler=command_report)
+    
+    bench = commands.add_parser('bench', parents=[common],
+                                help="bancs d'essai (pipeline comparé à la référence enregistrée) et vérifications")
+    bench.add_argument('--suite', dest='suites', nargs='+', choices=BENCHMARK_SUITES, default=['pipeline'],
+                       help="pipeline : étapes comparées à la référence ; storage : CSV et Parquet ; reporting : "
+                            "rapports entreprise ; startup : temps d'import (python -X importtime) ; fetch : collecte "
+                            "concurrente contre des serveurs locaux à latence injectée ; streaming : --stream reproduit "
+                            "la collecte complète ; sources : ingestion des tableaux publiés contre un serveur local")
+    bench.add_argument('--sizes', type=int, nargs='+', default=[25, 1000, 10000],
+                       help="tailles d'univers synthétique (nombre d'entreprises)")
+    bench.add_argument('--spans', type=int, nargs='+', default=[12, 24], help="nombres d'années simulées")
+    bench.add_argument('--cases', nargs='+', choices=BENCHMARK_CASES, default=list(BENCHMARK_CASES),
+                       help="étapes mesurées")
+    bench.add_argument('--repeat', type=int, default=5,
+                       help="répétitions de chaque cas (les cas courts sont enchaînés et répétés au moins 20 fois)")
+    bench.add_argument('--baseline', default=BENCHMARK_BASELINE, help="fichier JSON de référence")
+    bench.add_argument('--tolerance', type=float, default=None,
+                       help="dégradation tolérée du minimum calibré pour tous les cas (0.5 = 50 %% plus lent ; "
+                            "par défaut la tolérance propre à chaque cas)")
+    bench.add_argument('--startup-budget-ms', type=float, default=None,
+                       help="budget de démarrage en millisecondes (suite startup)")
+    bench.add_argument('--record', action='store_true', help="enregistre ces mesures comme nouvelle référence")
+    bench.set_defaults(handler=command_bench)
+    
+    compare = commands.add_parser('compare', parents=[common, reading, rendering],
+                                  help="analyse comparative d'entreprises à partir d'un jeu de données enregistré")
+    compare.set_defaults(handler=command_compare)
+    return parser
+
+
+# Fonction principale
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Sans sous-commande, la chaîne complète historique est exécutée (options comprises)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['run'] + argv
+    args = build_parser().parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    # Les étapes ne sont mesurées que si un rapport ou un profil est demandé
+    measured = args.run_report or args.prometheus_textfile or args.trace_memory or args.profile
+    args.profiler = StageProfiler(trace_memory=args.trace_memory) if measured else NoStageProfiler()
+    if not measured:
+        args.handler(args)
+        return
+    
+    with args.profiler.session(args.profile, args.profile_output):
+        args.handler(args)
+    print("\n⏱️  Étapes du pipeline:")
+    print(args.profiler.summary().to_string(float_format=lambda value: f"{value:.3f}"))
+    if args.run_report:
+        args.profiler.write_json(args.run_report, command=args.command, argv=argv)
+        print(f"📝 Rapport d'exécution sauvegardé dans '{args.run_report}'")
+    if args.prometheus_textfile:
+        args.profiler.write_prometheus(args.prometheus_textfile)
+        print(f"📝 Mesures Prometheus sauvegardées dans '{args.prometheus_textfile}'")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()